@@ -0,0 +1,79 @@
+"""
+Time spent drawing a frame with pygame draw calls versus the batch rasterizer (Canvas(batch=True)).
+
+    python -m benchmarks.batch_raster [--creatures 10 100 1000] [--frames 30] [--zoom 1]
+
+Both canvases get their own swarm with the same seed and inputs, so both draw exactly the same shapes.
+Reported per creature count: ms per frame (render + present) of each path and the fraction of pixels
+where both images differ (edges, pygame and the batch do not sample boundary pixels the same way).
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import time
+import numpy as np
+import pygame as py
+
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.canvas import Canvas
+from src.classes.camera import Camera
+
+
+def measure(n_creatures: int, n_frames: int, zoom: float = 1.0, draw_legs: bool = True, warmup: int = 5) -> dict[str, float]:
+    py.init()
+    py.display.set_mode((1280, 720))
+    settings = Settings(
+        WIDTH=1280, HEIGHT=720, N_ANIMALS=n_creatures, SEED=0, DRAW_LEGS=draw_legs, TEMPORAL_LOD=False,
+        WORLD_RADIUS=300 / zoom
+    )
+    settings.SCREEN_CENTER = (640, 360)
+    canvases = {
+        'pygame': Canvas(py.Surface((1280, 720)), camera=Camera(settings.SCREEN_CENTER, zoom)),
+        'batch': Canvas(py.Surface((1280, 720)), camera=Camera(settings.SCREEN_CENTER, zoom), batch=True),
+    }
+    swarms = {name: Swarm(canvas, settings, settings.SEED) for name, canvas in canvases.items()}
+    for swarm in swarms.values():
+        swarm.reset()
+
+    times = {name: [] for name in canvases}
+    for t in range(warmup + n_frames):
+        target = np.array([640 + 200 * np.cos(t / 30), 360 + 200 * np.sin(t / 30)])
+        for name, canvas in canvases.items():
+            swarms[name].step(target, 16)
+            canvas.fill(settings.BACKGROUND_COLOR)
+            start = time.perf_counter()
+            swarms[name].render()
+            canvas.present()
+            if t >= warmup:
+                times[name].append(time.perf_counter() - start)
+
+    images = [py.surfarray.pixels3d(canvas.display) for canvas in canvases.values()]
+    mismatch = float(np.mean(np.any(images[0] != images[1], axis=2)))
+    del images
+    return {
+        **{name: 1000 * float(np.median(frame_times)) for name, frame_times in times.items()},
+        'mismatch': mismatch,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--creatures', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--zoom', type=float, default=1.0)
+    parser.add_argument('--no-legs', action='store_true')
+    args = parser.parse_args()
+
+    print(f"{'creatures':>10} {'pygame ms':>10} {'batch ms':>10} {'speedup':>8} {'mismatch':>9}")
+    for n in args.creatures:
+        result = measure(n, args.frames, args.zoom, not args.no_legs)
+        print(
+            f"{n:>10} {result['pygame']:>10.2f} {result['batch']:>10.2f} "
+            f"{result['pygame'] / result['batch']:>7.2f}x {result['mismatch']:>9.2%}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Memory allocated by the steady-state frame path (step and render of the whole swarm, present is left out).
+
+    python -m benchmarks.frame_allocations [--creatures 100] [--frames 60] [--budget 32768] [--creature-budget 8192]
+
+Fails (exit code 1) when the transient allocation peak of a frame goes over `budget` bytes,
+when moving or drawing most creatures (90 %) goes over `creature-budget` bytes,
+when memory keeps growing from frame to frame or when the garbage collector has to run.
+Temporaries of a single creature are freed long before the peak of the frame and only show in the
+creature peak, the few creatures that rasterize a sprite missing from the cache are left to the frame one.
+The sprite and shape caches are kept small so they are already full (and stable) after the warmup frames.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import gc
+import sys
+import tracemalloc
+import numpy as np
+import pygame as py
+
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.canvas import Canvas
+from src.utils import kernels
+
+BUDGET = 32768  # Transient bytes the step and render of a frame may allocate
+CREATURE_BUDGET = 8192  # Transient bytes most creatures may allocate to move or to be drawn
+MAX_GROWTH = 1024  # Bytes per frame, a few are interpreter bookkeeping and not a leak
+
+
+def measure(n_creatures: int, n_frames: int, warmup: int = 20, draw_legs: bool = True, seed: int = 0) -> dict[str, float]:
+    py.init()
+    display = py.display.set_mode((1280, 720))
+    settings = Settings(WIDTH=1280, HEIGHT=720, N_ANIMALS=n_creatures, SEED=seed, DRAW_LEGS=draw_legs)
+    settings.SCREEN_CENTER = (640, 360)
+    canvas = Canvas(display, sprite_cache_bytes=4 * 2**20, shape_cache_bytes=2**17)
+    swarm = Swarm(canvas, settings, settings.SEED)
+    swarm.reset()
+
+    collections = [0]
+    def count_collections(phase, info):
+        if phase == 'start' and info['generation'] == 0:
+            collections[0] += 1
+
+    # Every creature is traced on its own, the peaks it resets are kept to rebuild the one of the frame
+    frame_peaks, creature_peaks = [], []
+    def traced(method):
+        def call(*args, **kwargs):
+            before, peak = tracemalloc.get_traced_memory()
+            frame_peaks.append(peak)
+            tracemalloc.reset_peak()
+            result = method(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+            frame_peaks.append(peak)
+            creature_peaks.append(peak - before)
+            return result
+        return call
+
+    for creature in swarm.creatures:
+        creature.move_towards = traced(creature.move_towards)
+        creature.render = traced(creature.render)
+
+    def frame(t: int) -> int:
+        """ :return: transient peak of the step and render of the swarm """
+        target = np.array([640 + 200 * np.cos(t / 30), 360 + 200 * np.sin(t / 30)])
+        canvas.fill(settings.BACKGROUND_COLOR)
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        frame_peaks.clear()
+        swarm.step(target, 16)
+        swarm.render()
+        _, peak = tracemalloc.get_traced_memory()
+        canvas.present()
+        return max(frame_peaks + [peak]) - before
+
+    # Traced from the start, otherwise objects that outlive a frame (cached shapes, the display list)
+    # replacing untraced ones would count as growth
+    tracemalloc.start()
+    for t in range(warmup):
+        frame(t)
+
+    peaks = []
+    gc.callbacks.append(count_collections)
+    start, _ = tracemalloc.get_traced_memory()
+    creature_peaks.clear()
+    for t in range(warmup, warmup + n_frames):
+        peaks.append(frame(t))
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.callbacks.remove(count_collections)
+
+    return {
+        'peak_per_frame': float(np.max(peaks)),
+        'peak_per_creature': float(np.percentile(creature_peaks, 90)),
+        'growth_per_frame': (end - start) / n_frames,
+        'gc_per_frame': collections[0] / n_frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--creatures', type=int, default=100)
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--budget', type=float, default=BUDGET, help='max transient bytes per frame')
+    parser.add_argument('--creature-budget', type=float, default=CREATURE_BUDGET,
+                        help='max transient bytes to move or draw most creatures')
+    parser.add_argument('--kernels', default='auto')
+    args = parser.parse_args()
+
+    kernels.select(args.kernels)
+    result = measure(args.creatures, args.frames)
+    print(f"kernels: {kernels.backend.name}")
+    for name, value in result.items():
+        print(f"{name}: {value:.2f}")
+
+    ok = (
+        result['peak_per_frame'] <= args.budget
+        and result['peak_per_creature'] <= args.creature_budget
+        and result['growth_per_frame'] <= MAX_GROWTH
+        and result['gc_per_frame'] == 0
+    )
+    if not ok:
+        print("FAILED: the frame path allocates more than the budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
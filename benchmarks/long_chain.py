@@ -0,0 +1,85 @@
+"""
+Cost of a single very long creature (snakes, eels) as the number of parts grows.
+
+    python -m benchmarks.long_chain [--parts 10 100 1000 5000] [--frames 30] [--kernels auto]
+
+Reported per body length: ms per frame of the chain constraint (solve_chain), the outline (body_outline),
+the whole step (body, legs, eyes) and the whole render into a display list (outline, smoothing, fins, legs),
+plus the time per part of step + render. The last line is the slope of log(time) against log(parts)
+from 100 parts on: 1 is linear.
+"""
+import argparse
+import time
+import numpy as np
+
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.display_list import DisplayList
+from src.utils import kernels
+
+
+def measure(n_parts: int, n_frames: int, warmup: int = 5) -> dict[str, float]:
+    settings = Settings(
+        WIDTH=1280, HEIGHT=720, N_ANIMALS=1, N_PARTS=n_parts, SEED=0, DRAW_LEGS=True, TEMPORAL_LOD=False
+    )
+    settings.SCREEN_CENTER = (640, 360)
+    screen = DisplayList()
+    swarm = Swarm(screen, settings, settings.SEED)
+    swarm.reset()
+    creature = swarm.creatures[0]
+
+    times = {'solve_chain': [], 'body_outline': [], 'step': [], 'render': []}
+    for t in range(warmup + n_frames):
+        # Always moving, so nothing is left asleep
+        target = np.array([640 + 300 * np.cos(t / 10), 360 + 300 * np.sin(t / 10)])
+        start = time.perf_counter()
+        swarm.step(target, 16)
+        stepped = time.perf_counter()
+        screen.clear()
+        swarm.render()
+        rendered = time.perf_counter()
+
+        body_pos = creature.body_pos.copy()
+        kernels.backend.solve_chain(body_pos, creature.get_links())
+        solved = time.perf_counter()
+        kernels.backend.body_outline(
+            creature.body_pos, creature.body_size, creature.body_direction, settings.SPECIAL_SMOOTHING, creature.outline
+        )
+        outlined = time.perf_counter()
+
+        if t >= warmup:
+            times['step'].append(stepped - start)
+            times['render'].append(rendered - stepped)
+            times['solve_chain'].append(solved - rendered)
+            times['body_outline'].append(outlined - solved)
+    return {name: 1000 * float(np.median(values)) for name, values in times.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parts', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--kernels', default='auto')
+    args = parser.parse_args()
+
+    kernels.select(args.kernels)
+    print(f"kernels: {kernels.backend.name}")
+    print(f"{'parts':>6} {'solve ms':>9} {'outline ms':>11} {'step ms':>8} {'render ms':>10} {'us/part':>8}")
+    totals = []
+    for n in args.parts:
+        result = measure(n, args.frames)
+        total = result['step'] + result['render']
+        totals.append(total)
+        print(
+            f"{n:>6} {result['solve_chain']:>9.3f} {result['body_outline']:>11.3f} {result['step']:>8.3f} "
+            f"{result['render']:>10.3f} {1000 * total / n:>8.2f}"
+        )
+
+    long = [(n, total) for n, total in zip(args.parts, totals) if n >= 100]
+    if len(long) > 1:
+        slope = np.polyfit(np.log([n for n, _ in long]), np.log([total for _, total in long]), 1)[0]
+        print(f"scaling exponent: {slope:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,45 @@
 # Library imports
+import os
 import pygame as py
-import numpy as np
-import random
 # Implementation imports
-from src.settings.settings import Settings, Colors, get_rgb_iterator
-from src.utils.Text import Text, TextManagement
-from src.classes import procedural_animals as pa
+from src.settings.settings import Settings
+from src.utils.Text import TextManagement
+from src.classes.swarm import Swarm
+from src.classes.canvas import Canvas
+from src.classes.camera import Camera
+from src.utils import kernels
+
+
+def load_world(canvas, settings, text_management):
+    """ Swarm and camera saved in SETTINGS.SNAPSHOT_PATH, None if it can not be loaded """
+    try:
+        swarm, extra = Swarm.load(settings.SNAPSHOT_PATH, canvas, settings)
+    except (OSError, ValueError, KeyError) as error:
+        print(f"Could not load '{settings.SNAPSHOT_PATH}': {error}")
+        return None
+    if 'camera' in extra:
+        x, y, zoom = extra['camera']
+        canvas.camera = Camera((x, y), zoom)
+    canvas.set_scale(settings.RENDER_SCALE)
+
+    text_management.N_Animals.set_value(settings.N_ANIMALS)
+    text_management.Speed_Wheel.set_value(settings.MOVING_SPEED)
+    text_management.Size_S_W.set_value(round(settings.FISH_SIZE, 2))
+    text_management.Zoom.set_value(round(canvas.camera.zoom, 2))
+    text_management.Debugging_Mode_1.set_value(settings.DEBUGGING_MODE)
+    text_management.Overlap_Body_2.set_value(settings.OVERLAP_BODY)
+    text_management.Draw_Eyes_3.set_value(settings.DRAW_EYES)
+    text_management.Draw_Fins_4.set_value(settings.DRAW_FINS)
+    text_management.Draw_Legs_5.set_value(settings.DRAW_LEGS)
+    text_management.Dynamic_Scale_6.set_value(settings.DYNAMIC_RENDER_SCALE)
+    text_management.Render_Scale.set_value(round(canvas.scale, 2))
+    text_management.Fin_Sprites_7.set_value(settings.FIN_SPRITES)
+    text_management.Temporal_LOD_8.set_value(settings.TEMPORAL_LOD)
+    canvas.set_batch(settings.BATCH_RASTER)
+    text_management.Batch_Raster_9.set_value(settings.BATCH_RASTER)
+    return swarm
+
+
 def main():
     # ================ INITIAL VARIABLES ================
     py.init()
@@ -16,6 +50,11 @@ def main():
     CLOCK = py.time.Clock()
     SETTINGS = Settings(WIDTH=screen_info.current_w, HEIGHT=screen_info.current_h)
     SETTINGS.SCREEN_CENTER = (SETTINGS.WIDTH / 2, SETTINGS.HEIGHT / 2)
+    kernels.select(SETTINGS.KERNEL_BACKEND)
+    CANVAS = Canvas(
+        SCREEN, SETTINGS.RENDER_SCALE, SETTINGS.MIN_RENDER_SCALE, SETTINGS.SMOOTH_UPSCALE,
+        SETTINGS.SPRITE_CACHE_BYTES, SETTINGS.SPRITE_ANGLE_STEP, batch=SETTINGS.BATCH_RASTER
+    )
     texts: dict ={
         'FPS': (SETTINGS.REFERENCE_FPS, 0, 0),
         '(Up / Down ↕)': (SETTINGS.N_ANIMALS, 0, 20),
@@ -24,74 +63,50 @@ def main():
         'Size_S_W': (SETTINGS.FISH_SIZE, 0, 60),
         'Text_R': ("Press R to reset", 0, 80),
         'Text_T': ("Press T hide text", 0, 100),
+        'Text_Snapshot': ("F5 to save, F9 to load", 0, 200),
+        'Text_Camera': ("Right drag to pan, +/- to zoom, C to recenter", 0, 140),
+        'Kernels': (kernels.backend.name, 0, 120),
+        'Zoom': (CANVAS.camera.zoom, 0, 160),
+        'Drawn': ("0 / 0", 0, 180),
 
         'Debugging_Mode_1': (SETTINGS.OVERLAP_BODY, SETTINGS.WIDTH - 175, 0),
         'Overlap_Body_2': (SETTINGS.OVERLAP_BODY, SETTINGS.WIDTH - 175, 20),
         'Draw_Eyes_3': (SETTINGS.DRAW_EYES, SETTINGS.WIDTH - 175, 40),
         'Draw_Fins_4': (SETTINGS.DRAW_FINS, SETTINGS.WIDTH - 175, 60),
         'Draw_Legs_5': (SETTINGS.DRAW_LEGS, SETTINGS.WIDTH - 175, 80),
+        'Dynamic_Scale_6': (SETTINGS.DYNAMIC_RENDER_SCALE, SETTINGS.WIDTH - 175, 100),
+        'Render_Scale': (round(CANVAS.scale, 2), SETTINGS.WIDTH - 175, 120),
+        'Fin_Sprites_7': (SETTINGS.FIN_SPRITES, SETTINGS.WIDTH - 175, 140),
+        'Temporal_LOD_8': (SETTINGS.TEMPORAL_LOD, SETTINGS.WIDTH - 175, 160),
+        'LOD_Skipped': ("0 / 0", SETTINGS.WIDTH - 175, 180),
+        'Batch_Raster_9': (SETTINGS.BATCH_RASTER, SETTINGS.WIDTH - 175, 200),
         # 'ANGLE_DIF': (0, 0, 100)
     }
     TEXT_MANAGEMENT: TextManagement = TextManagement(texts)
 
     # ================ OBJECTS ================
-    def reset_objects() -> list[pa.ProceduralCreature]:
-        center = np.array(SETTINGS.SCREEN_CENTER)
-        return [
-            pa.ProceduralCreature(
-                SCREEN,
-                center + np.random.uniform(-1000, 1000, 2),
-                [
-                    np.log((SETTINGS.N_PARTS-i+1)) * SETTINGS.FISH_REFERENCE_SIZE
-                    for i in range(SETTINGS.N_PARTS)
-                ],
-                # [50, 40, 30, 40, 30, 40, 30, 25, 20, 20, 15, 10, 5, 5],
-                color_base, color_contrast,
-                SETTINGS
-            )
-            for color_base, color_contrast in
-                zip(get_rgb_iterator(SETTINGS.N_ANIMALS, 0.75), get_rgb_iterator(SETTINGS.N_ANIMALS, 1))
-        ]
-    def add_objects(n: int):
-        center = np.array(SETTINGS.SCREEN_CENTER)
-        indices = list(range(SETTINGS.N_ANIMALS))
-        random.shuffle(indices)
-
-        color_base_list = list(get_rgb_iterator(SETTINGS.N_ANIMALS, 0.75))
-        color_contrast_list = list(get_rgb_iterator(SETTINGS.N_ANIMALS, 1))
-        return [
-            pa.ProceduralCreature(
-                SCREEN,
-                center + np.random.uniform(-1000, 1000, 2),
-                [
-                    np.log((SETTINGS.N_PARTS - i + 1)) * SETTINGS.FISH_REFERENCE_SIZE
-                    for i in range(SETTINGS.N_PARTS)
-                ],
-                # [50, 40, 30, 40, 30, 40, 30, 25, 20, 20, 15, 10, 5, 5],
-                color_base, color_contrast,
-                SETTINGS
-            )
-            for color_base, color_contrast in
-            zip(
-                [color_base_list[i] for i in indices[:n]],
-                [color_contrast_list[i] for i in indices[:n]]
-            )
-        ]
-    objects = reset_objects()
+    SWARM = None
+    if SETTINGS.RESUME_SNAPSHOT and os.path.exists(SETTINGS.SNAPSHOT_PATH):
+        SWARM = load_world(CANVAS, SETTINGS, TEXT_MANAGEMENT)
+    if SWARM is None:
+        SWARM = Swarm(CANVAS, SETTINGS, SETTINGS.SEED)
+        SWARM.reset()
 
     # ================ RUNNING LOOP ================
     while SETTINGS.RUNNING:
         # ================ BASE ================
-        SCREEN.fill(SETTINGS.BACKGROUND_COLOR)
+        CANVAS.fill(SETTINGS.BACKGROUND_COLOR)
         delta_time = CLOCK.tick(SETTINGS.REFERENCE_FPS)
         if delta_time == 0: continue
         TEXT_MANAGEMENT.FPS.set_value(round(1/delta_time, 2)*SETTINGS.REFERENCE_FPS)
+        if SETTINGS.FIXED_DELTA_TIME is not None:
+            delta_time = SETTINGS.FIXED_DELTA_TIME
         # ================ OBJECT HANDLER ================
-        for obj in objects:
-            obj.follow_mouse(delta_time)
-            angle = obj.render(delta_time)
-            obj.update_settings(SETTINGS)
-            # TEXT_MANAGEMENT.ANGLE_DIF.set_value((round(angle, 4)))
+        view = CANVAS.view_rect()
+        SWARM.step(CANVAS.to_world(py.mouse.get_pos()), delta_time, view)
+        SWARM.render(view)
+        TEXT_MANAGEMENT.LOD_Skipped.set_value(f"{SWARM.scheduler.skipped} / {len(SWARM)}")
+        TEXT_MANAGEMENT.Drawn.set_value(f"{SWARM.drawn} / {len(SWARM)}")
         # ================ KEY HANDLER ================
         key = py.key.get_pressed()
         if key[py.K_w]:
@@ -110,7 +125,24 @@ def main():
                 if event.key == py.K_ESCAPE:
                     SETTINGS.RUNNING = False; break
                 if event.key == py.K_r:
-                    objects = reset_objects()
+                    SWARM.reset(SETTINGS.SEED)
+                if event.key == py.K_F5:
+                    camera = CANVAS.camera
+                    try:
+                        SWARM.save(SETTINGS.SNAPSHOT_PATH, {'camera': [*camera.center.tolist(), camera.zoom]})
+                    except OSError as error:
+                        print(f"Could not save '{SETTINGS.SNAPSHOT_PATH}': {error}")
+                if event.key == py.K_F9:
+                    SWARM = load_world(CANVAS, SETTINGS, TEXT_MANAGEMENT) or SWARM
+                if event.key in (py.K_PLUS, py.K_EQUALS, py.K_KP_PLUS):
+                    CANVAS.camera.zoom_at(1.25, py.mouse.get_pos(), SCREEN.get_size())
+                    TEXT_MANAGEMENT.Zoom.set_value(round(CANVAS.camera.zoom, 2))
+                if event.key in (py.K_MINUS, py.K_KP_MINUS):
+                    CANVAS.camera.zoom_at(0.8, py.mouse.get_pos(), SCREEN.get_size())
+                    TEXT_MANAGEMENT.Zoom.set_value(round(CANVAS.camera.zoom, 2))
+                if event.key == py.K_c:
+                    CANVAS.camera = Camera(SETTINGS.SCREEN_CENTER)
+                    TEXT_MANAGEMENT.Zoom.set_value(CANVAS.camera.zoom)
                 if event.key == py.K_t:
                     SETTINGS.SHOW_TEXT = not SETTINGS.SHOW_TEXT
                 if event.key == py.K_1:
@@ -128,15 +160,33 @@ def main():
                 if event.key == py.K_5:
                     SETTINGS.DRAW_LEGS = not SETTINGS.DRAW_LEGS
                     TEXT_MANAGEMENT.Draw_Legs_5.set_value(SETTINGS.DRAW_LEGS)
+                if event.key == py.K_6:
+                    SETTINGS.DYNAMIC_RENDER_SCALE = not SETTINGS.DYNAMIC_RENDER_SCALE
+                    TEXT_MANAGEMENT.Dynamic_Scale_6.set_value(SETTINGS.DYNAMIC_RENDER_SCALE)
+                    if not SETTINGS.DYNAMIC_RENDER_SCALE:
+                        CANVAS.set_scale(SETTINGS.RENDER_SCALE)
+                        TEXT_MANAGEMENT.Render_Scale.set_value(round(CANVAS.scale, 2))
+                if event.key == py.K_7:
+                    SETTINGS.FIN_SPRITES = not SETTINGS.FIN_SPRITES
+                    TEXT_MANAGEMENT.Fin_Sprites_7.set_value(SETTINGS.FIN_SPRITES)
+                if event.key == py.K_8:
+                    SETTINGS.TEMPORAL_LOD = not SETTINGS.TEMPORAL_LOD
+                    TEXT_MANAGEMENT.Temporal_LOD_8.set_value(SETTINGS.TEMPORAL_LOD)
+                if event.key == py.K_9:
+                    SETTINGS.BATCH_RASTER = not SETTINGS.BATCH_RASTER
+                    CANVAS.set_batch(SETTINGS.BATCH_RASTER)
+                    TEXT_MANAGEMENT.Batch_Raster_9.set_value(SETTINGS.BATCH_RASTER)
                 if event.key == py.K_UP:
                     SETTINGS.N_ANIMALS = SETTINGS.N_ANIMALS + 1
                     TEXT_MANAGEMENT.N_Animals.set_value(SETTINGS.N_ANIMALS)
-                    objects += add_objects(1)
+                    SWARM.add(1)
                 if event.key == py.K_DOWN:
                     if  SETTINGS.N_ANIMALS > 0:
                         SETTINGS.N_ANIMALS = SETTINGS.N_ANIMALS - 1
                         TEXT_MANAGEMENT.N_Animals.set_value(SETTINGS.N_ANIMALS)
-                        objects = objects[:-1]
+                        SWARM.remove(1)
+            elif event.type == py.MOUSEMOTION and event.buttons[2]:
+                CANVAS.camera.pan(event.rel)
             elif event.type == py.MOUSEWHEEL:
                 SETTINGS.MOVING_SPEED += event.y*0.025
                 if SETTINGS.MOVING_SPEED < 0:
@@ -145,8 +195,12 @@ def main():
                 TEXT_MANAGEMENT.Speed_Wheel.set_value(SETTINGS.MOVING_SPEED)
 
         # ================ RE-RENDER ================
-        TEXT_MANAGEMENT.render(SCREEN, SETTINGS.SHOW_TEXT)
+        TEXT_MANAGEMENT.render(CANVAS, SETTINGS.SHOW_TEXT)
+        CANVAS.present()
         py.display.update()
+        if SETTINGS.DYNAMIC_RENDER_SCALE:
+            CANVAS.adapt_scale(CLOCK.get_rawtime(), SETTINGS.FRAME_BUDGET)
+            TEXT_MANAGEMENT.Render_Scale.set_value(round(CANVAS.scale, 2))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
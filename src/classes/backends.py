@@ -0,0 +1,111 @@
+import numpy as np
+import pygame as py
+
+from src.utils import utils
+from src.classes.raster import BatchedBackend
+from src.settings.settings import Colors, color_type
+
+
+class Fonts:
+    """ Pygame fonts by size, created the first time they are used """
+    def __init__(self, name: str = "Arial"):
+        self.name = name
+        self.fonts: dict[int, py.font.Font] = {}
+
+    def draw(self, surface: py.Surface, text: str, pos: utils.point_type, color: color_type, size: int):
+        if size not in self.fonts:
+            self.fonts[size] = py.font.SysFont(self.name, size)
+        surface.blit(self.fonts[size].render(text, True, color), pos)
+
+
+class PygameBackend:
+    """
+    Draws every primitive of the display list right away with pygame onto the surface of the canvas.
+    Sprites are rasterized once per key and scale and rotated once per angle (rounded to
+    sprite_angle_step degrees) through the sprite cache of the canvas.
+    """
+    name = 'pygame'
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.fonts = Fonts()
+
+    def polygon(self, color: color_type, points, width: int = 0):
+        canvas = self.canvas
+        py.draw.polygon(canvas.surface, color, canvas.to_screen(points), canvas.to_width(width))
+
+    def circle(self, color: color_type, center: utils.point_type, radius: float, width: int = 0):
+        canvas = self.canvas
+        py.draw.circle(
+            canvas.surface, color, canvas.to_screen(center), canvas.to_length(radius), canvas.to_width(width)
+        )
+
+    def sprite(self, key: tuple, points: np.ndarray, color: color_type, angle: float,
+               center: utils.point_type, outline: int = 3):
+        canvas = self.canvas
+        angle = round(angle / canvas.sprite_angle_step) * canvas.sprite_angle_step % 360
+        # Rounded so zooming does not rasterize a new sprite every frame
+        pixel_scale = round(canvas.pixel_scale, 2)
+        base_key = key + (pixel_scale,)
+
+        def rasterize():
+            scaled = points * pixel_scale
+            width = 0 if outline == 0 else max(1, round(outline * pixel_scale))
+            radius = int(np.ceil(np.max(np.abs(scaled)))) + width + 1
+            surface = py.Surface((2 * radius, 2 * radius), py.SRCALPHA)
+            py.draw.polygon(surface, color, scaled + radius)  # Fill
+            if width:
+                py.draw.polygon(surface, Colors.WHITE, scaled + radius, width)  # Shape
+            return surface
+
+        def rotate():
+            # Rotating keeps the pivot in the center, pygame rotates counterclockwise on screen
+            return py.transform.rotate(canvas.sprites.get(base_key, rasterize), -angle)
+
+        sprite = canvas.sprites.get(base_key + (angle,), rotate)
+        x, y = canvas.to_screen(center)
+        canvas.surface.blit(sprite, (x - sprite.get_width() / 2, y - sprite.get_height() / 2))
+
+    def text(self, text: str, pos: utils.point_type, color: color_type, size: int):
+        self.fonts.draw(self.canvas.display, text, pos, color, size)
+
+    def finish(self):
+        pass
+
+
+class BatchBackend(BatchedBackend):
+    """
+    Queues the polygons of the frame and fills all of them at once with numpy (see PolygonBatch),
+    straight into the pixels of the surface of the canvas. Texts are still drawn by pygame.
+    """
+    name = 'batch'
+
+    def __init__(self, canvas):
+        super().__init__()
+        self.canvas = canvas
+        self.fonts = Fonts()
+
+    def to_screen(self, points) -> np.ndarray:
+        return self.canvas.to_screen(points)
+
+    def to_length(self, length: float) -> float:
+        return self.canvas.to_length(length)
+
+    def to_width(self, width: int) -> int:
+        return self.canvas.to_width(width)
+
+    def text(self, text: str, pos: utils.point_type, color: color_type, size: int):
+        self.fonts.draw(self.canvas.display, text, pos, color, size)
+
+    def finish(self):
+        if not len(self.batch):
+            return
+        surface = self.canvas.surface
+        if surface.get_bytesize() == 3:
+            pixels = py.surfarray.pixels3d(surface).transpose(1, 0, 2)  # (height, width, 3)
+            values = np.array(self.batch.colors, dtype=np.uint8)
+        else:
+            pixels = py.surfarray.pixels2d(surface).T  # (height, width)
+            values = np.array([surface.map_rgb(color) for color in self.batch.colors], dtype=pixels.dtype)
+        self.batch.flush(pixels, values)
+        del pixels  # Unlocks the surface
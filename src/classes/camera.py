@@ -0,0 +1,29 @@
+import numpy as np
+
+from src.utils import utils
+
+
+class Camera:
+    """
+    Part of the world shown on the display: `center` is the world point in the middle
+    of the display and `zoom` how many display pixels one world unit takes.
+    """
+    def __init__(self, center: utils.point_type, zoom: float = 1.0, min_zoom: float = 0.05, max_zoom: float = 4.0):
+        self.center = np.array(center, dtype=float)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.zoom = float(np.clip(zoom, min_zoom, max_zoom))
+
+    def pan(self, delta: utils.point_type):
+        """ Moves the view by `delta` display pixels (the world follows the cursor when dragging) """
+        self.center -= np.asarray(delta, dtype=float) / self.zoom
+
+    def zoom_at(self, factor: float, anchor: utils.point_type, display_size: tuple[int, int]):
+        """
+        Multiplies the zoom keeping the world point under `anchor` (display pixels) in place
+        """
+        half = np.asarray(display_size, dtype=float) / 2
+        offset = np.asarray(anchor, dtype=float) - half
+        world = offset / self.zoom + self.center
+        self.zoom = float(np.clip(self.zoom * factor, self.min_zoom, self.max_zoom))
+        self.center = world - offset / self.zoom
@@ -0,0 +1,122 @@
+import numpy as np
+import pygame as py
+
+from src.utils import utils
+from src.utils.sprite_cache import SpriteCache
+from src.classes.camera import Camera
+from src.classes.display_list import DisplayList
+from src.classes.backends import BatchBackend, PygameBackend
+from src.settings.settings import color_type
+
+
+class Canvas(DisplayList):
+    """
+    Drawing target of the simulation: records the display list of a frame, in world coordinates, and
+    `present` draws it with its backend, seen through the camera, onto an offscreen surface
+    of `scale` times the display resolution, which is then upscaled onto the display.
+    With scale 1 the offscreen surface is the display itself and nothing is copied.
+    With `batch` shapes are filled together with numpy (BatchBackend) instead of one pygame call each.
+    """
+    SCALE_STEP: float = 0.05
+
+    def __init__(self, display, scale: float = 1.0, min_scale: float = 0.25, smooth: bool = True,
+                 sprite_cache_bytes: int = 128 * 2**20, sprite_angle_step: float = 3, camera: Camera = None,
+                 batch: bool = False, shape_cache_bytes: int = 2**20):
+        super().__init__(shape_cache_bytes)
+        self.display = display
+        self.half_size = np.array(display.get_size(), dtype=float) / 2
+        # Without a camera the world is in display pixels
+        self.camera = Camera(self.half_size) if camera is None else camera
+        self.min_scale = min_scale
+        self.smooth = smooth
+        self.sprites = SpriteCache(sprite_cache_bytes)
+        self.sprite_angle_step = sprite_angle_step
+        self.frame_time = None  # Exponential moving average of the frame time (ms)
+        self.cooldown = 0
+        self.set_batch(batch)
+        self.set_scale(scale)
+
+    def set_batch(self, enabled: bool):
+        self.batch = enabled
+        self.backend = BatchBackend(self) if enabled else PygameBackend(self)
+
+    # =================== RESOLUTION ===================
+    def set_scale(self, scale: float):
+        scale = round(round(float(np.clip(scale, self.min_scale, 1.0)) / self.SCALE_STEP) * self.SCALE_STEP, 2)
+        if getattr(self, 'scale', None) == scale:
+            return
+        self.scale = scale
+        if scale == 1:
+            self.surface = self.display
+        else:
+            w, h = self.display.get_size()
+            self.surface = py.Surface((max(1, int(w * scale)), max(1, int(h * scale))), 0, self.display)
+
+    def adapt_scale(self, frame_time: float, budget: float):
+        """
+        Dynamic resolution: lowers the scale while the frame time is over budget and
+        raises it back once there is enough headroom.
+        :param frame_time: time (ms) spent on the last frame
+        :param budget: target time (ms) per frame
+        """
+        if self.frame_time is None:
+            self.frame_time = frame_time
+        self.frame_time = 0.9 * self.frame_time + 0.1 * frame_time
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        if self.frame_time > budget * 1.1 and self.scale > self.min_scale:
+            self.set_scale(self.scale - self.SCALE_STEP)
+            self.cooldown = 15
+        elif self.frame_time < budget * 0.7 and self.scale < 1:
+            self.set_scale(self.scale + self.SCALE_STEP)
+            self.cooldown = 60
+
+    # =================== COORDINATES ===================
+    @property
+    def pixel_scale(self) -> float:
+        """ Pixels of the offscreen surface per world unit """
+        return self.camera.zoom * self.scale
+
+    def to_screen(self, points) -> np.ndarray:
+        """ World coordinates -> pixels of the offscreen surface """
+        points = np.asarray(points, dtype=float) - self.camera.center
+        points *= self.camera.zoom
+        points += self.half_size
+        if self.scale != 1:
+            points *= self.scale
+        return points
+
+    def to_world(self, pos: utils.point_type) -> np.ndarray:
+        """ Display pixels (e.g. the mouse) -> world coordinates """
+        return (np.asarray(pos, dtype=float) - self.half_size) / self.camera.zoom + self.camera.center
+
+    def view_rect(self) -> tuple[float, float, float, float]:
+        """ Visible part of the world (x0, y0, x1, y1) """
+        x0, y0 = self.to_world((0, 0))
+        x1, y1 = self.to_world(self.display.get_size())
+        return x0, y0, x1, y1
+
+    def to_length(self, length: float) -> float:
+        return length * self.pixel_scale
+
+    def to_width(self, width: int) -> int:
+        """ Outline widths never go below one pixel, 0 still means filled """
+        return width if width == 0 else max(1, round(width * self.pixel_scale))
+
+    # =================== DRAWING ===================
+    def fill(self, color: color_type):
+        """ Starts a new frame, everything recorded so far is dropped """
+        self.clear()
+        self.surface.fill(color)
+
+    def present(self):
+        """ Draws the display list with the backend, upscales it onto the display and adds the texts on top """
+        self.draw(self.backend)
+        if self.surface is not self.display:
+            if self.smooth:
+                py.transform.smoothscale(self.surface, self.display.get_size(), self.display)
+            else:
+                py.transform.scale(self.surface, self.display.get_size(), self.display)
+        self.draw_texts(self.backend)
+        self.clear()
@@ -0,0 +1,106 @@
+from typing import Callable
+import numpy as np
+
+from src.utils import utils
+from src.utils.sprite_cache import SpriteCache
+from src.settings.settings import Colors, color_type
+
+POLYGON, CIRCLE, SPRITE = range(3)
+
+
+class DisplayList:
+    """
+    Everything drawn in a frame, in drawing order and in world coordinates.
+    The simulation only records primitives here, a backend turns them into pixels with `draw`:
+    pygame draw calls (PygameBackend), pygame with batched filling (BatchBackend) or plain
+    numpy (RasterBackend), so creatures can be simulated and drawn without pygame.
+
+    Points are kept by reference until the list is cleared, whoever records them must not
+    change them before the list is drawn. The slots are reused from frame to frame so
+    recording does not allocate once the list has grown to the size of a frame.
+    """
+    def __init__(self, shape_cache_bytes: int = 2**20):
+        self.shape_cache = SpriteCache(shape_cache_bytes)  # Polygon of every sprite, by key
+        self.count = 0
+        # One slot per primitive, unused fields are None
+        self.kinds: list[int] = []
+        self.colors: list[color_type] = []
+        self.points: list[np.ndarray] = []  # Vertices of a polygon, center of a circle or sprite
+        self.sizes: list[float] = []  # Radius of a circle, angle of a sprite
+        self.widths: list[int] = []  # Outline width, 0 fills
+        self.keys: list[tuple] = []  # Key of a sprite
+        self.shapes: list[np.ndarray] = []  # Polygon of a sprite, relative to its center
+        # HUD, in display pixels and always on top: (text, pos, color, size)
+        self.texts: list[tuple[str, utils.point_type, color_type, int]] = []
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        self.texts.clear()
+
+    def record(self, kind: int, color: color_type, points, size: float, width: int,
+               key: tuple = None, shape: np.ndarray = None):
+        i = self.count
+        if i == len(self.kinds):
+            self.kinds.append(kind)
+            self.colors.append(color)
+            self.points.append(points)
+            self.sizes.append(size)
+            self.widths.append(width)
+            self.keys.append(key)
+            self.shapes.append(shape)
+        else:
+            self.kinds[i] = kind
+            self.colors[i] = color
+            self.points[i] = points
+            self.sizes[i] = size
+            self.widths[i] = width
+            self.keys[i] = key
+            self.shapes[i] = shape
+        self.count = i + 1
+
+    # =================== PRIMITIVES ===================
+    def polygon(self, color: color_type, points, width: int = 0):
+        """ :param width: outline width in world units, 0 fills the polygon """
+        self.record(POLYGON, color, points, None, width)
+
+    def circle(self, color: color_type, center: utils.point_type, radius: float, width: int = 0):
+        self.record(CIRCLE, color, center, radius, width)
+
+    def sprite(self, key: tuple, build_points: Callable[[], np.ndarray], color: color_type,
+               angle: float, center: utils.point_type, outline: int = 3):
+        """
+        A filled + outlined polygon that only moves and rotates, backends may cache it rasterized.
+        :param key: identifies the shape, it must change whenever build_points would return something else
+        :param build_points: returns the polygon relative to its pivot, only called when the key is new
+        :param angle: rotation of the x-axis of the polygon (degrees, same orientation as the world)
+        :param center: world position of the pivot
+        """
+        # Resolved now, what the callable uses may have changed once the list is drawn
+        self.record(SPRITE, color, center, angle, outline, key, self.shape_cache.get(key, build_points))
+
+    def text(self, text: str, pos: utils.point_type, color: color_type = Colors.WHITE, size: int = 15):
+        """ :param pos: top left corner in display pixels """
+        self.texts.append((text, pos, color, size))
+
+    # =================== DRAWING ===================
+    def draw(self, backend):
+        """ Hands every primitive to the backend in order, then lets it finish the frame """
+        kinds, colors, points, sizes, widths, keys, shapes = (
+            self.kinds, self.colors, self.points, self.sizes, self.widths, self.keys, self.shapes
+        )
+        for i in range(self.count):
+            kind = kinds[i]
+            if kind == POLYGON:
+                backend.polygon(colors[i], points[i], widths[i])
+            elif kind == CIRCLE:
+                backend.circle(colors[i], points[i], sizes[i], widths[i])
+            else:
+                backend.sprite(keys[i], shapes[i], colors[i], sizes[i], points[i], widths[i])
+        backend.finish()
+
+    def draw_texts(self, backend):
+        for text, pos, color, size in self.texts:
+            backend.text(text, pos, color, size)
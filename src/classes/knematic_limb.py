@@ -1,8 +1,9 @@
+import functools
+import math
 import numpy as np
-import pygame as py
 from typing import Union
 
-from src.utils import utils
+from src.utils import utils, kernels
 
 point_type = Union[tuple[float, float], np.ndarray]
 def parse_point(point: point_type):
@@ -33,17 +34,34 @@ def get_point_from_pdl(point: np.array, d: float, l: float, rad: bool = True) ->
 class Limb:
     def __init__(
             self, screen, pos: point_type, init_d: float, length: float, thickness: float,
-            color: tuple[int, int, int] = (68, 190, 242)
+            color: tuple[int, int, int] = (68, 190, 242),
+            joints: np.ndarray = None, angles: np.ndarray = None, index: int = 0
     ):
+        """
+        The start point and the angle of the limb live in joints[index] and angles[index].
+        A Tentacle passes its own arrays so the whole chain can be solved at once by the kernels.
+        """
         self.screen = screen
-        self.pos = parse_point(pos)
+        self.joints = np.zeros((1, 2)) if joints is None else joints
+        self.angles = np.zeros(1) if angles is None else angles
+        self.index = index
+        self.update_pos(pos)
+        self.update_angle(np.float64(init_d))
 
-        self.theta = np.float64(init_d)
-        self.theta_rad = self.theta * np.pi / 180
         self.length = np.float64(length)
         self.thickness = thickness
         self.color = color
 
+    @property
+    def pos(self) -> np.ndarray:
+        return self.joints[self.index]
+    @property
+    def theta(self) -> np.float64:
+        return self.angles[self.index]
+    @property
+    def theta_rad(self) -> np.float64:
+        return self.theta * np.pi / 180
+
     def get_start_point(self):
         return self.pos
     def get_end_point(self):
@@ -58,7 +76,7 @@ class Limb:
     def get_thickness(self):
         return self.thickness
     def update_pos(self, pos: point_type):
-        self.pos = parse_point(pos)
+        self.joints[self.index] = parse_point(pos)
 
     def update_angle(self, angle_deg: float, prev_angle: float = None):
         # if prev_angle is not None:
@@ -67,8 +85,7 @@ class Limb:
         #     if abs(diff) > Settings.MAX_BEND_LIMB:
         #         angle_deg = prev_angle + np.sign(diff)*Settings.MAX_BEND_LIMB
 
-        self.theta = angle_deg
-        self.theta_rad = self.theta * np.pi / 180
+        self.angles[self.index] = angle_deg
 
     def render(self, draw_joint: bool = False, thickness: float = None):
         """
@@ -110,9 +127,9 @@ class Limb:
 
         points = [corner1, corner3, corner4, corner2]
         # Draw the rectangle using Pygame's draw.polygon
-        py.draw.polygon(self.screen, self.color, points)
+        self.screen.polygon(self.color, points)
         if draw_joint:
-            py.draw.circle(self.screen, (255,255,255), self.pos, thickness)
+            self.screen.circle((255,255,255), self.pos, thickness)
 
 class Tentacle:
     def __init__(
@@ -126,44 +143,112 @@ class Tentacle:
         self.thickness = thickness
         self.smooth_factor = smooth_factor
         self.color = color
-        self.objective: point_type = utils.parse_point(objective)
-
-        # Calculate the sum of the logarithms & Calculate k such that the sum of parts equals L
-        log_sum = np.sum(np.log(np.arange(1, n_limbs + 1)))  # Sum of log(i) for i = 1 to N
-        self.k_len = total_length / log_sum
-        self.k_thick = thickness / log_sum
-
-        if shorten_first_limb:
-            self.limbs: list[Limb] = [Limb(
-                screen,
-                pos,
-                0,
-                self.k_len * np.log(n_limbs * 0.75),
-                self.k_thick * np.log(n_limbs),
-                color = color,
-            )]
-        else:
-            self.limbs: list[Limb] = [Limb(
-                screen,
-                pos,
-                0,
-                self.k_len * np.log(n_limbs),
-                self.k_thick * np.log(n_limbs),
-                color=color,
-            )]
+        self.objective = np.array(objective, dtype=float)  # Own copy, updated in place
+
+        # State of every limb, shared with the Limb objects
+        self.joints = np.zeros((n_limbs, 2))
+        self.angles = np.zeros(n_limbs)
+
+        lengths, thicknesses = self.limb_sizes(n_limbs, total_length, thickness, shorten_first_limb)
+        self.limbs: list[Limb] = [Limb(
+            screen,
+            pos,
+            0,
+            lengths[0],
+            thicknesses[0],
+            color=color,
+            joints=self.joints, angles=self.angles, index=0
+        )]
         for i in range(1, n_limbs):
             self.limbs += [
                 Limb(
                     screen,
                     self.limbs[i-1].get_end_point(),
                     -i * 90/n_limbs,
-                    self.k_len * np.log(n_limbs-i+1), #self.limb_length/(i+1),
-                    self.k_thick * np.log(n_limbs-i+1), #thickness/(i+1)
+                    lengths[i],
+                    thicknesses[i],
                     color = color,
+                    joints=self.joints, angles=self.angles, index=i
                 )
             ]
+        self.init_buffers()
+
+    @classmethod
+    def from_state(cls, screen, joints: np.ndarray, angles: np.ndarray, objective: np.ndarray,
+                   total_length: float, thickness: float, smooth_factor: float,
+                   color: tuple[int, int, int], shorten_first_limb: bool = False,
+                   asleep: bool = False) -> 'Tentacle':
+        """
+        Rebuilds a saved tentacle around the given arrays (see ProceduralCreature.get_leg_state),
+        they are used as they are (not copied) and nothing is placed or solved.
+        :param joints: (n_limbs, 2) start of every limb
+        :param angles: (n_limbs,) angle of every limb
+        :param asleep: whether it was asleep when saved
+        """
+        self = cls.__new__(cls)
+        self.screen = screen
+        self.limb_length = total_length/len(angles)
+        self.thickness = thickness
+        self.smooth_factor = smooth_factor
+        self.color = color
+        self.objective = objective
+
+        self.joints = joints
+        self.angles = angles
+        lengths, thicknesses = cls.limb_sizes(len(angles), total_length, thickness, shorten_first_limb)
+        self.limbs = [
+            Limb(screen, joints[i], angles[i], lengths[i], thicknesses[i], color=color,
+                 joints=joints, angles=angles, index=i)
+            for i in range(len(angles))
+        ]
+        self.init_buffers()
+        self.asleep = asleep
+        return self
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def limb_sizes(n_limbs: int, total_length: float, thickness: float,
+                   shorten_first_limb: bool = False) -> tuple[tuple[float, ...], tuple[float, ...]]:
+        """
+        :return: length and thickness of every limb, they shrink along the tentacle
+        """
+        # Calculate the sum of the logarithms & Calculate k such that the sum of parts equals L
+        log_sum = np.sum(np.log(np.arange(1, n_limbs + 1)))  # Sum of log(i) for i = 1 to N
+        k_len = total_length / log_sum
+        k_thick = thickness / log_sum
 
+        lengths = [k_len * np.log(n_limbs * 0.75) if shorten_first_limb else k_len * np.log(n_limbs)]
+        thicknesses = [k_thick * np.log(n_limbs)]
+        for i in range(1, n_limbs):
+            lengths.append(k_len * np.log(n_limbs-i+1)) #self.limb_length/(i+1),
+            thicknesses.append(k_thick * np.log(n_limbs-i+1)) #thickness/(i+1)
+        return tuple(lengths), tuple(thicknesses)
+
+    def init_buffers(self):
+        """ Limb sizes, scratch buffers and sleep state, everything that follows from the limbs """
+        n_limbs = len(self.limbs)
+        self.lengths = np.array([limb.get_length() for limb in self.limbs])
+        self.thicknesses = np.array([limb.get_thickness() for limb in self.limbs])
+        # Scratch buffers of get_drawing_points
+        self.drawing_points = np.empty((4 * n_limbs + 2, 2))
+        self.scratch = np.empty((5, n_limbs))
+
+        # Sleep: once the tip is as close to the objective as it gets the IK is skipped until the base or the objective moves
+        self.version = 0  # Changes whenever a limb moves
+        self.points_version = None  # Version the drawing points were computed for
+        self.asleep = False
+        self.previous_angles = np.empty(n_limbs)
         self.length = sum(limb.get_length() for limb in self.limbs)
+        # Objectives closer to the base than this can not be reached, the longest limb does not fold enough
+        self.inner_reach = max(0.0, 2 * float(self.lengths.max()) - self.length)
+
+    def detach(self):
+        """ Copies the arrays given to `from_state` into memory of its own, the limbs follow """
+        self.joints = self.joints.copy()
+        self.angles = self.angles.copy()
+        self.objective = self.objective.copy()
+        for limb in self.limbs:
+            limb.joints, limb.angles = self.joints, self.angles
 
     def render(self, draw_joint: bool = False, thickness: float = None):
         for limb in self.limbs:
@@ -178,37 +263,47 @@ class Tentacle:
     def get_length(self):
         return self.length
 
-    def get_drawing_points(self):
-        points_1 = [self.limbs[0].get_start_point()]
-        points_2 = []
-
-        for limb in self.limbs:
-            pos = limb.get_start_point()
-            direction = np.array([
-                np.cos(np.radians(limb.get_angle())),
-                np.sin(np.radians(limb.get_angle()))
-            ])
-            perpend = utils.get_perpendicular(direction)
-            points_1 += [
-                pos + perpend * limb.get_thickness(),
-                pos + perpend * limb.get_thickness() + direction * limb.get_thickness() * 1.3
-            ]
-            points_2 += [
-                pos - perpend * limb.get_thickness(),
-                pos - perpend * limb.get_thickness() + direction * limb.get_thickness() * 1.3
-            ]
-
-        points_1 += [self.limbs[-1].get_end_point()]
-
-        return points_1 + list(reversed(points_2))
-
-    def follow_mouse(self, delta_time: float):
-        x, y = py.mouse.get_pos()
-        self.point_towards((x, y), delta_time)
-
-    def move_tentacle_to(self,pos: point_type):
+    def get_drawing_points(self) -> np.ndarray:
+        """
+        Outline of the tentacle: base, one side from base to tip, tip and the other side back.
+        Written into a buffer owned by the tentacle, copy it if it has to outlive the next call.
+        """
+        if self.points_version == self.version:
+            return self.drawing_points
+        self.points_version = self.version
+        n = len(self.limbs)
+        points = self.drawing_points
+        np.radians(self.angles, out=self.scratch[0])
+        directions, perpends = self.scratch[1:3], self.scratch[3:5]
+        np.cos(self.scratch[0], out=directions[0])
+        np.sin(self.scratch[0], out=directions[1])
+        perpends[0] = directions[1]
+        np.negative(directions[0], out=perpends[1])
+        perpends *= self.thicknesses
+        directions *= self.thicknesses
+        directions *= 1.3
+
+        points[0] = self.joints[0]
+        side_1 = points[1:2 * n + 1]
+        np.add(self.joints, perpends.T, out=side_1[0::2])
+        np.add(side_1[0::2], directions.T, out=side_1[1::2])
+        points[2 * n + 1] = self.limbs[-1].get_end_point()
+        side_2 = points[2 * n + 2:][::-1]
+        np.subtract(self.joints, perpends.T, out=side_2[0::2])
+        np.add(side_2[0::2], directions.T, out=side_2[1::2])
+        return points
+
+    def move_tentacle_to(self,pos: point_type, epsilon: float = 0.0):
+        """
+        :param epsilon: a sleeping tentacle ignores moves of up to this many pixels
+        """
+        if self.asleep:
+            if np.abs(np.subtract(pos, self.joints[0])).max() <= epsilon:
+                return
+            self.asleep = False
         self.limbs[0].update_pos(pos)
         self.update_limbs()
+        self.version += 1
 
     def move_tentacle_by(self, pos: point_type):
         if isinstance(pos, tuple):
@@ -218,37 +313,44 @@ class Tentacle:
 
         self.move_tentacle_to(self.limbs[0].get_start_point() + pos)
 
-    def point_towards(self, delta_time: float, pos: point_type = None):
+    def point_towards(self, delta_time: float, pos: point_type = None, epsilon: float = 0.0):
+        """
+        :param pos: new objective, None keeps the current one
+        :param epsilon: the tentacle falls asleep once its tip is less than this many pixels away from
+                        the closest it can get to the objective. It does not depend on the time step.
+                        With 0 it only falls asleep when a step changes nothing.
+        """
         if pos is not None:
-            self.objective = parse_point(pos)
-
-        head = self.limbs[-1].get_end_point()
-        if np.array_equal(head, self.objective):
+            # Copied, the caller may reuse its buffer for the next frame
+            self.objective[:] = pos
+            self.asleep = False
+        if self.asleep:
             return
 
-        n: int = len(self.limbs)
-        for i, limb in enumerate(reversed(self.limbs)):
-            v1 = head - limb.get_start_point()
-            v2 = self.objective - limb.get_start_point()
-
-            dot = np.dot(v1,v2)
-            mag_v1 = np.linalg.norm(v1)
-            mag_v2 = np.linalg.norm(v2)
-
-            cos_theta = np.clip(dot /(mag_v1 * mag_v2), -1.0, 1.0)
-            angle_rad = np.arccos(cos_theta)
-            angle_deg = np.degrees(angle_rad)
-            cross_product = v1[0] * v2[1] - v1[1] * v2[0]
-            # Update the angle proportionally to the i-th joint
-            new_angle = (
-                    limb.get_angle() + (np.sign(cross_product) * angle_deg) *
-                    delta_time * self.smooth_factor / (n-i+2)
-            )
-            limb.update_angle(new_angle, self.limbs[i-1].get_angle() if i >= 1 else None)
-
-            self.update_limbs(i)
+        self.previous_angles[:] = self.angles
+        kernels.backend.point_towards(
+            self.joints, self.angles, self.lengths, self.objective, delta_time, self.smooth_factor
+        )
+        self.version += 1
+        if epsilon > 0:
+            self.asleep = self.objective_gap() <= epsilon
+        else:
+            # The next step would repeat this one exactly
+            self.asleep = np.array_equal(self.angles, self.previous_angles)
+
+    def objective_gap(self) -> float:
+        """ How much closer to the objective the tip could still get (px) """
+        theta = math.radians(self.angles[-1])
+        tip_x = self.joints[-1, 0] + self.lengths[-1] * math.cos(theta)
+        tip_y = self.joints[-1, 1] + self.lengths[-1] * math.sin(theta)
+        base_x, base_y = self.joints[0, 0], self.joints[0, 1]
+        reach = math.hypot(self.objective[0] - base_x, self.objective[1] - base_y)
+        # Out of reach the closest the tip gets is the stretched (or folded) tentacle pointing at the objective
+        scale = min(max(reach, self.inner_reach), self.length) / reach if reach > 0 else 0.0
+        closest_x = base_x + (self.objective[0] - base_x) * scale
+        closest_y = base_y + (self.objective[1] - base_y) * scale
+        return math.hypot(closest_x - tip_x, closest_y - tip_y)
 
     def update_limbs(self, i: int = 0):
-        n: int = len(self.limbs)
-        for j, limb_j in enumerate(self.limbs[n - i:], n - i):
-            limb_j.update_pos(self.limbs[j - 1].get_end_point())
\ No newline at end of file
+        """ Moves the last i limbs to the end of their previous one """
+        kernels.backend.forward_kinematics(self.joints, self.angles, self.lengths, len(self.limbs) - i)
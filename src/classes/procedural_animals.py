@@ -1,36 +1,47 @@
 import numpy as np
-import pygame as py
 
-from src.utils import utils
+from src.utils import utils, kernels
 from src.classes import knematic_limb as kl
 from src.settings.settings import Colors, Settings, color_type
 
+# Legs are smoothed like the body but their resolution does not grow with the length of the body
+MAX_LEG_POINTS_SMOOTH = 128
+# Length of the tail fin behind the last part, in average body sizes
+TAIL_FIN_LENGTH = 2
+
 
 class WobblyEyes:
     def __init__(self, screen, pos1: utils.point_type, pos2: utils.point_type, radius: float):
         self.screen = screen
-        self.pos1 = utils.parse_point(pos1)
-        self.pos2 = utils.parse_point(pos2)
+        self.pos1 = np.array(pos1, dtype=float)
+        self.pos2 = np.array(pos2, dtype=float)
         self.radius = radius
-
-    def render(self):
-        mouse = utils.parse_point(py.mouse.get_pos())
-        direction_1 = mouse - self.pos1
-        direction_1 /= np.linalg.norm(direction_1)
-        direction_2 = mouse - self.pos2
-        direction_2 /= np.linalg.norm(direction_2)
-
-        py.draw.circle(self.screen, Colors.WHITE, self.pos1, self.radius)
-        py.draw.circle(self.screen, Colors.WHITE, self.pos2, self.radius)
-        py.draw.circle(self.screen, Colors.BLACK, self.pos1 + direction_1 * self.radius * 0.8, self.radius * 0.4)
-        py.draw.circle(self.screen, Colors.BLACK, self.pos2 + direction_2 * self.radius * 0.8, self.radius * 0.4)
+        self.pupils = np.empty((2, 2))  # Scratch buffer, drawn by reference
+        self.pupil_1, self.pupil_2 = self.pupils
+
+    def render(self, target: utils.point_type):
+        """
+        :param target: world point the eyes look at
+        """
+        np.subtract(target, self.pos1, out=self.pupils[0])
+        np.subtract(target, self.pos2, out=self.pupils[1])
+        self.pupils /= np.linalg.norm(self.pupils, axis=1, keepdims=True)
+        self.pupils *= self.radius * 0.8
+        self.pupils[0] += self.pos1
+        self.pupils[1] += self.pos2
+
+        self.screen.circle(Colors.WHITE, self.pos1, self.radius)
+        self.screen.circle(Colors.WHITE, self.pos2, self.radius)
+        self.screen.circle(Colors.BLACK, self.pupil_1, self.radius * 0.4)
+        self.screen.circle(Colors.BLACK, self.pupil_2, self.radius * 0.4)
 
     def set_pos(self, pos1, pos2):
-        self.pos1, self.pos2 = pos1, pos2
+        self.pos1[:] = pos1
+        self.pos2[:] = pos2
 
 class ProceduralCreature:
     def __init__(self, screen, pos: utils.point_type,
-                 body_size: list[float], color_base: color_type,
+                 body_size: list[float] | np.ndarray, color_base: color_type,
                  color_contrast: color_type, settings: Settings
     ):
         self.screen = screen
@@ -38,127 +49,243 @@ class ProceduralCreature:
         self.body_size = np.array(body_size)
 
         self.n = len(body_size)
-        self.avg_body_size = sum(body_size) / self.n
+        self.avg_body_size = sum(self.original_body_size.tolist()) / self.n
         self.angle_dif = 0
 
         self.body_pos = [utils.parse_point(pos)]
         self.body_direction = np.array([0,0], dtype=float)
+        self.target = self.body_pos[0].copy()
         self.start_body_pos()
         self.color_base = color_base
         self.color_contrast = color_contrast
 
         self.settings = settings
-        self.n_points_smooth = int(self.n * 5 + body_size[0])
+        self.init_parts()
+
+        self.leg_state = None
+        self._legs: dict[int, list[kl.Tentacle]] = {}
+        self.generate_legs(self.members_indices)
+
+    @classmethod
+    def from_state(cls, screen, body_pos: np.ndarray, original_body_size: np.ndarray,
+                   body_direction: np.ndarray, target: np.ndarray,
+                   color_base: color_type, color_contrast: color_type, settings: Settings,
+                   eyes: np.ndarray = None, leg_state: tuple[np.ndarray, ...] = None,
+                   sleep_state: np.ndarray = None, angle_dif: float = 0.0
+    ) -> 'ProceduralCreature':
+        """
+        Rebuilds a saved creature around the given arrays, they are used as they are (not copied),
+        and so are the arrays of its legs.
+        :param eyes: (2, 2) position of both eyes, computed from the body when not given
+        :param leg_state: joints (t, k, 2), angles (t, k), objectives (t, 2) and asleep (t,) of its t tentacles,
+                          as returned by `get_leg_state`. The legs are only built around them the first time
+                          they are needed (see `legs`). New legs are placed along the body without it
+        :param sleep_state: (3, 2) as returned by `get_sleep_state`, the creature starts awake without it
+        :param angle_dif: bend of the body when it was saved, the tail fin and the reach follow it
+        """
+        self = cls.__new__(cls)
+        self.screen = screen
+        self.original_body_size = original_body_size
+        self.body_size = original_body_size * settings.FISH_SIZE
+
+        self.n = len(original_body_size)
+        self.avg_body_size = sum(self.body_size.tolist()) / self.n
+        self.angle_dif = angle_dif
+
+        self.body_pos = body_pos
+        self.body_direction = body_direction
+        self.target = target
+        self.color_base = color_base
+        self.color_contrast = color_contrast
+
+        self.settings = settings
+        self.init_parts(eyes)
+        if sleep_state is not None:
+            self.set_sleep_state(sleep_state)
+
+        self.leg_state = leg_state
+        self._legs = {}
+        if leg_state is None:
+            self.generate_legs(self.members_indices)
+        return self
+
+    def detach(self):
+        """ Copies the arrays given to `from_state` (views of a mapped snapshot) into memory of its own """
+        self.body_pos = self.body_pos.copy()
+        self.original_body_size = self.original_body_size.copy()
+        self.body_direction = self.body_direction.copy()
+        self.target = self.target.copy()
+        if self.leg_state is not None:
+            self.leg_state = tuple(array.copy() for array in self.leg_state)
+        for pair in self._legs.values():
+            for tentacle in pair:
+                tentacle.detach()
+
+    def init_parts(self, eyes: np.ndarray = None):
+        """ Eyes, legs layout and scratch buffers, everything that follows from the body """
+        self.n_points_smooth = int(self.n * 5 + self.body_size[0])
+        self.leg_points_smooth = min(self.n_points_smooth, MAX_LEG_POINTS_SMOOTH)
         self.fin_points = 16
 
-        pos1, pos2 = self.get_eyes_pos()
-        self.eyes = WobblyEyes(self.screen, pos1, pos2, body_size[0]*0.5)
+        pos1, pos2 = self.get_eyes_pos() if eyes is None else eyes
+        self.eyes = WobblyEyes(self.screen, pos1, pos2, self.body_size[0]*0.5)
 
         self.members_index_1 = int(self.n * 0.2)
         self.members_index_2 = int(self.n * 0.3)
         self.members_index_3 = int(self.n * 0.7)
         self.members_indices = [self.members_index_1, self.members_index_3]
-
-        self.legs: dict[int, list[kl.Tentacle]] = {}
         self.support_points: list[np.ndarray] = []
-        self.generate_legs(self.members_indices)
+
+        # =================== SCRATCH BUFFERS ===================
+        # Reused every frame so the steady-state path does not allocate per body part
+        self.steer = np.empty(2)
+        self.perpend = np.empty(2)
+        self.links = np.empty(self.n - 1)
+        self.outline = np.empty((kernels.outline_size(self.n, self.settings.SPECIAL_SMOOTHING), 2))
+        # anchor 1, anchor 2, support 1, support 2 of every pair of legs
+        self.leg_points = {index: np.zeros((4, 2)) for index in self.members_indices}
+        # Pivots of the lateral fins, they are drawn by reference
+        self.fin_centers = {index: (np.zeros(2), np.zeros(2)) for index in self.members_indices}
+
+        # =================== SLEEP ===================
+        # `version` changes when the body moves more than SLEEP_EPSILON, everything computed from
+        # the body (outline, smoothed shapes) is reused while it does not
+        self.version = 0
+        self.asleep = False
+        self.settled_head = np.full(2, np.inf)  # Head and direction at the last change, inf forces the first one
+        self.settled_direction = np.full(2, np.inf)
+        self.settled_links = None
+        self.outline_key = None
+        self.smoothed: dict[tuple, tuple[tuple, np.ndarray]] = {}  # part -> (version, smoothed points)
+        self.reach = 0.0
+        self.reach_links = None  # (OVERLAP_BODY, FISH_SIZE) the reach was computed with
+
+    @property
+    def legs(self) -> dict[int, list[kl.Tentacle]]:
+        """ Legs of a loaded creature are built from its saved state the first time they are needed """
+        if self.leg_state is not None:
+            leg_state, self.leg_state = self.leg_state, None
+            self.generate_legs(self.members_indices, leg_state)
+        return self._legs
+
+    def tentacles(self) -> list[kl.Tentacle]:
+        return [tentacle for index in self.members_indices for tentacle in self.legs[index]]
+
+    def get_leg_state(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: joints (t, k, 2), angles (t, k), objectives (t, 2) and asleep (t,) of the t tentacles
+        """
+        if self.leg_state is not None:
+            # Never built, still as it was loaded
+            return self.leg_state
+        tentacles = self.tentacles()
+        return (
+            np.array([tentacle.joints for tentacle in tentacles]),
+            np.array([tentacle.angles for tentacle in tentacles]),
+            np.array([tentacle.get_objective() for tentacle in tentacles], dtype=float),
+            np.array([tentacle.asleep for tentacle in tentacles], dtype=bool)
+        )
+
+    def get_sleep_state(self) -> np.ndarray:
+        """
+        What `has_moved` compares against. `asleep` itself is not part of it, every step starts by setting it.
+        :return: (3, 2) settled head, settled direction and settled (OVERLAP_BODY, FISH_SIZE), NaN when unset
+        """
+        links = (np.nan, np.nan) if self.settled_links is None else self.settled_links
+        return np.array([self.settled_head, self.settled_direction, links], dtype=float)
+
+    def set_sleep_state(self, sleep_state: np.ndarray):
+        self.settled_head[:] = sleep_state[0]
+        self.settled_direction[:] = sleep_state[1]
+        overlap, fish_size = sleep_state[2].tolist()
+        self.settled_links = None if np.isnan(overlap) else (bool(overlap), fish_size)
 
     def update_settings(self, settings: Settings):
         self.settings = settings
 
         # Adjust body size
-        self.body_size = self.original_body_size * settings.FISH_SIZE
+        np.multiply(self.original_body_size, settings.FISH_SIZE, out=self.body_size)
 
-        self.avg_body_size = sum(self.body_size) / self.n
+        self.avg_body_size = sum(self.body_size.tolist()) / self.n
         self.n_points_smooth = int(self.n * 5 + self.body_size[0])
-        pos1, pos2 = self.get_eyes_pos()
-        self.eyes = WobblyEyes(self.screen, pos1, pos2, float(self.body_size[0]*0.5))
+        self.leg_points_smooth = min(self.n_points_smooth, MAX_LEG_POINTS_SMOOTH)
+        self.eyes.radius = float(self.body_size[0]*0.5)
+        self.update_eyes_pos()
+        self.version += 1
 
 
-    def draw_smooth_points(self, points, n_points_smooth: int = None, color: color_type = None):
+    def draw_smooth_points(self, points, n_points_smooth: int = None, color: color_type = None, *,
+                           part: tuple, version=None):
+        """
+        :param part: identifies the shape, its smoothed points are kept and reused while `version` does not change
+        """
         if n_points_smooth is None:
             n_points_smooth = self.n_points_smooth
         if color is None:
             color = self.color_base
 
-        x_smooth, y_smooth = utils.b_spline(points + [points[0]], n_points_smooth)  # add first point again to close loop
-        smooth_points = list(zip(x_smooth, y_smooth))
-        py.draw.polygon(self.screen, color, smooth_points)  # Fill
-        py.draw.polygon(self.screen, Colors.WHITE, smooth_points, 3)  # Shape
+        cached_version, smooth_points = self.smoothed.get(part, (None, None))
+        if smooth_points is None or len(smooth_points) != n_points_smooth:
+            cached_version, smooth_points = None, np.empty((n_points_smooth, 2))
+        if cached_version != version:
+            self.smooth_shape(points, n_points_smooth, smooth_points)
+            self.smoothed[part] = (version, smooth_points)
+        self.screen.polygon(color, smooth_points)  # Fill
+        self.screen.polygon(Colors.WHITE, smooth_points, 3)  # Shape
+
+    @staticmethod
+    def smooth_shape(points, n_points_smooth: int, out: np.ndarray = None) -> np.ndarray:
+        points = np.asarray(points, dtype=float)
+        x_smooth, y_smooth = utils.b_spline(np.vstack([points, points[:1]]), n_points_smooth)  # add first point again to close loop
+        if out is None:
+            out = np.empty((n_points_smooth, 2))
+        out[:, 0] = x_smooth
+        out[:, 1] = y_smooth
+        return out
+
+    def draw_sprite(self, shape: tuple, control_points, n_points_smooth: int, color: color_type,
+                    center: np.ndarray, direction: np.ndarray):
+        """
+        Draws a smooth shape that only moves and rotates between frames. It is rasterized once
+        and then reused (rotated) through the sprite cache of the canvas.
+        :param shape: hashable description of the shape, part of the cache key together with the colour
+        :param control_points: relative to `center`, with `direction` as the x-axis
+        """
+        self.screen.sprite(
+            shape + (n_points_smooth, color),
+            lambda: self.smooth_shape(control_points, n_points_smooth),
+            color, np.degrees(np.arctan2(direction[1], direction[0])), center
+        )
 
     def draw_debug_points(self, points, size: float = 3, color: color_type = Colors.BLACK):
         for point in points:
-            py.draw.circle(self.screen, color, point, size)
-
-    def render(self, delta_time: float):
-        # =================== MAIN HEAD POINTS ===================
-        perpend = utils.get_perpendicular(self.body_direction)
-        nose1 = self.body_direction * self.body_size[0]*1.25 + self.body_pos[0]
-        nose2 = self.body_direction * self.body_size[0] + self.body_pos[0] - perpend * self.body_size[0] * 0.6
-        nose3 = self.body_direction * self.body_size[0] + self.body_pos[0] + perpend * self.body_size[0] * 0.6
-
-        shape_1: list[utils.point_type] = [
-            nose2, nose1, nose3,
-            perpend * self.body_size[0] + self.body_pos[0]
-        ]
-        shape_2: list[utils.point_type] = [
-            -perpend * self.body_size[0] + self.body_pos[0]
-        ]
+            self.screen.circle(color, point, size)
 
+    def render(self):
         # =================== BODY ===================
-        prev_dir = self.body_direction
-        self.angle_dif = 0
-        for i in range(1, self.n -1):
-            direction = self.body_pos[i-1] - self.body_pos[i]
-            direction /= np.linalg.norm(direction)
-            perpend = utils.get_perpendicular(direction)
-
-
-            angle_dif = utils.compute_angle(direction, prev_dir, normalized=True) # Both normalized, denominator = 1
-            self.angle_dif += utils.cross_product(direction, prev_dir) * angle_dif
-            prev_dir = direction
-
-            if Settings.SPECIAL_SMOOTHING:
-                shape_1 += [perpend*(self.body_size[i] + self.body_size[i-1])/2 + self.body_pos[i] + direction*self.body_size[i]/3]
-                shape_1 += [perpend*self.body_size[i] + self.body_pos[i]]
-                if i < self.n - 1:
-                    shape_1 += [perpend*(self.body_size[i] + self.body_size[i+1])/2 + self.body_pos[i] - direction*self.body_size[i]/3]
-
-                shape_2 += [-perpend * (self.body_size[i] + self.body_size[i - 1]) / 2 + self.body_pos[i] + direction*self.body_size[i]/3]
-                shape_2 += [-perpend * self.body_size[i] + self.body_pos[i]]
-                if i < self.n - 1:
-                    shape_2 += [-perpend*(self.body_size[i] + self.body_size[i+1])/2 + self.body_pos[i] - direction*self.body_size[i]/3]
-            else:
-                shape_1 += [perpend*self.body_size[i] + self.body_pos[i]]
-                shape_2 += [-perpend * self.body_size[i] + self.body_pos[i]]
-
-        # Add the point with the tail
-        if self.n > 1:
-            direction = self.body_pos[-2] - self.body_pos[-1]
-            direction /= np.linalg.norm(direction)
-
-            angle_dif = utils.compute_angle(direction, prev_dir, normalized=True)  # Both normalized, denominator = 1
-            self.angle_dif += utils.cross_product(direction, prev_dir) * angle_dif
-
-            tail = -direction * self.body_size[-1] + self.body_pos[-1]
-            shape_1 += [perpend * self.body_size[-1] + self.body_pos[-1],
-                        tail]
-            shape_2 += [-perpend * self.body_size[-1] + self.body_pos[-1]]
-
-        self.angle_dif = np.degrees(self.angle_dif / (self.n - 1))  # Number of angles between body parts
+        # Only computed again once the body moved (see has_moved)
+        key = (self.version, self.settings.SPECIAL_SMOOTHING)
+        if key != self.outline_key:
+            size = kernels.outline_size(self.n, self.settings.SPECIAL_SMOOTHING)
+            if len(self.outline) != size:
+                self.outline = np.empty((size, 2))
+            _, self.angle_dif = kernels.backend.body_outline(
+                self.body_pos, self.body_size, self.body_direction, self.settings.SPECIAL_SMOOTHING, self.outline
+            )
+            self.outline_key = key
+        shape_points = self.outline
 
         # =================== DRAWING THE POINTS ===================
         #                       ORDER MATTERS
-        shape_points = shape_1 + list(reversed(shape_2)) # Connect the pairs of points
         if self.settings.DEBUGGING_MODE:
             for body_part, body_size in zip(self.body_pos, self.body_size):
-                py.draw.circle(self.screen, Colors.WHITE, body_part, body_size, 1)
-                py.draw.circle(self.screen, Colors.WHITE, body_part, 5)
+                self.screen.circle(Colors.WHITE, body_part, body_size, 1)
+                self.screen.circle(Colors.WHITE, body_part, 5)
             self.draw_debug_points(shape_points, 5)
 
         if self.settings.DRAW_LEGS:
             for index in self.members_indices:
-                self.draw_fin_legs(index, delta_time)
+                self.draw_fin_legs(index)
 
         if self.settings.DRAW_FINS:
             for index in self.members_indices:
@@ -166,10 +293,10 @@ class ProceduralCreature:
             self.draw_tail_fin()
 
         if not self.settings.DEBUGGING_MODE:
-            self.draw_smooth_points(shape_points)
+            self.draw_smooth_points(shape_points, part=('body',), version=self.outline_key)
 
         if self.settings.DRAW_EYES:
-            self.eyes.render()
+            self.eyes.render(self.target)
 
         if self.settings.DRAW_FINS:
             self.draw_fin_back_fin(self.members_index_2)
@@ -183,17 +310,46 @@ class ProceduralCreature:
         return pos1, pos2
 
     def update_eyes_pos(self):
-        self.eyes.set_pos(*self.get_eyes_pos())
+        # Same as get_eyes_pos but written straight into the eyes
+        pos1, pos2 = self.eyes.pos1, self.eyes.pos2
+        np.multiply(self.body_direction, self.body_size[0], out=pos1)
+        pos1 += self.body_pos[0]
+        pos2[:] = pos1
+        self.perpend[0] = self.body_direction[1]
+        self.perpend[1] = -self.body_direction[0]
+        self.perpend *= self.body_size[0]
+        self.perpend *= 0.6
+        pos1 -= self.perpend
+        pos2 += self.perpend
 
     def draw_tail_fin(self):
         assert self.n >= 3, "Need at least 3 parts to draw the tail fin"
 
         direction = self.body_pos[-2] - self.body_pos[-1]
         direction /= np.linalg.norm(direction)
-        perpend = utils.get_perpendicular(direction)
 
-        fin_length_prop = 2
-        points_fin = [
+        fin_length_prop = TAIL_FIN_LENGTH
+        if self.settings.DEBUGGING_MODE:
+            self.draw_debug_points(self.tail_fin_points(direction), color=Colors.RED)
+        elif self.settings.FIN_SPRITES:
+            # Only deforms with the bend of the body, one sprite per (rounded) bend
+            size = round(self.body_size[-1] * 2) / 2
+            length = round(self.avg_body_size * fin_length_prop * 2) / 2
+            bend = round(self.angle_dif * 2) / 2
+            control_points = [(-size * 0.5, 0), (-length * 0.2, 0), (-length * 0.8, 0), (-length, bend)]
+            self.draw_sprite(
+                ('tail_fin', size, length, bend), control_points, self.fin_points * 2,
+                self.color_contrast, self.body_pos[-1], direction
+            )
+        else:
+            self.draw_smooth_points(self.tail_fin_points(direction), self.fin_points * 2, self.color_contrast,
+                                    part=('tail_fin',), version=self.outline_key)
+
+    def tail_fin_points(self, direction: np.ndarray) -> list[np.ndarray]:
+        """ Control points of the tail fin, the sprites do without them """
+        perpend = utils.get_perpendicular(direction)
+        fin_length_prop = TAIL_FIN_LENGTH
+        return [
             self.body_pos[-1] - direction*self.body_size[-1]*0.5, # hidden inside the sape so it curves (more or less)
             self.body_pos[-1] - direction*self.avg_body_size*fin_length_prop * 0.2,
             # self.body_pos[-1] - direction*self.avg_body_size*fin_length_prop * 0.5,
@@ -201,11 +357,6 @@ class ProceduralCreature:
             self.body_pos[-1] - direction*self.avg_body_size*fin_length_prop - perpend*self.angle_dif
         ]
 
-        if self.settings.DEBUGGING_MODE:
-            self.draw_debug_points(points_fin, color=Colors.RED)
-        else:
-            self.draw_smooth_points(points_fin, self.fin_points * 2, self.color_contrast)
-
     def draw_fin_back_fin(self, index: int):
         assert self.n >= 4, "Need at least 4 parts to draw the back fin"
 
@@ -219,61 +370,89 @@ class ProceduralCreature:
         if self.settings.DEBUGGING_MODE:
             self.draw_debug_points(points_fin, color=Colors.RED)
         else:
-            self.draw_smooth_points(points_fin, self.fin_points * 2, self.color_contrast)
+            self.draw_smooth_points(points_fin, self.fin_points * 2, self.color_contrast,
+                                    part=('back_fin', index), version=self.outline_key)
 
     def draw_fin_lateral_fin(self, index: int):
         assert self.n >= 2, "Need at least 2 parts to draw the side fins"
+        fin_point_1, fin_point_2 = self.fin_centers[index]
         if index < 2 :
             index = 2
-        direction = self.body_pos[index - 2] - self.body_pos[index]
-        direction /= np.linalg.norm(direction)
-        perpend = utils.get_perpendicular(direction)
+        np.subtract(self.body_pos[index - 2], self.body_pos[index], out=self.steer)
+        self.steer /= np.linalg.norm(self.steer)
+        self.perpend[0] = self.steer[1]
+        self.perpend[1] = -self.steer[0]
 
         width  = self.avg_body_size * 0.5
         height = self.avg_body_size * 0.75
         # fin 1
-        fin_point_1 = perpend * self.body_size[index] + self.body_pos[index]
+        np.multiply(self.perpend, self.body_size[index], out=fin_point_1)
+        np.subtract(self.body_pos[index], fin_point_1, out=fin_point_2)
+        fin_point_1 += self.body_pos[index]
         direction_1 = self.body_pos[index - 1] - fin_point_1
         direction_1 /= np.linalg.norm(direction_1)
-        perpend_1 = utils.get_perpendicular(direction_1)
-
-        points_fin_1 = [
-            fin_point_1 + direction_1 * height,
-            fin_point_1 + perpend_1 * width,
-            fin_point_1 - direction_1 * height,
-            fin_point_1 - perpend_1 * width,
-        ]
-
-        fin_point_2 = - perpend * self.body_size[index] + self.body_pos[index]
+        # fin 2
         direction_2 = self.body_pos[index - 1] - fin_point_2
         direction_2 /= np.linalg.norm(direction_2)
-        perpend_2 = utils.get_perpendicular(direction_2)
 
-        points_fin_2 = [
-            fin_point_2 + direction_2 * height,
-            fin_point_2 + perpend_2 * width,
-            fin_point_2 - direction_2 * height,
-            fin_point_2 - perpend_2 * width,
-        ]
         if self.settings.DEBUGGING_MODE:
-            self.draw_debug_points(points_fin_1 + points_fin_2, color=Colors.RED)
-
+            self.draw_debug_points(
+                self.lateral_fin_points(fin_point_1, direction_1, width, height)
+                + self.lateral_fin_points(fin_point_2, direction_2, width, height),
+                color=Colors.RED
+            )
+        elif self.settings.FIN_SPRITES:
+            # Fixed shape that only rotates with the body
+            width, height = round(width * 2) / 2, round(height * 2) / 2
+            control_points = [(height, 0), (0, -width), (-height, 0), (0, width)]
+            self.draw_sprite(('lateral_fin', width, height), control_points, self.fin_points,
+                             self.color_contrast, fin_point_1, direction_1)
+            self.draw_sprite(('lateral_fin', width, height), control_points, self.fin_points,
+                             self.color_contrast, fin_point_2, direction_2)
         else:
-            self.draw_smooth_points(points_fin_1, self.fin_points, self.color_contrast)
-            self.draw_smooth_points(points_fin_2, self.fin_points, self.color_contrast)
+            self.draw_smooth_points(self.lateral_fin_points(fin_point_1, direction_1, width, height),
+                                    self.fin_points, self.color_contrast,
+                                    part=('lateral_fin', index, 0), version=self.outline_key)
+            self.draw_smooth_points(self.lateral_fin_points(fin_point_2, direction_2, width, height),
+                                    self.fin_points, self.color_contrast,
+                                    part=('lateral_fin', index, 1), version=self.outline_key)
+
+    @staticmethod
+    def lateral_fin_points(fin_point: np.ndarray, direction: np.ndarray,
+                           width: float, height: float) -> list[np.ndarray]:
+        """ Control points of a lateral fin around its pivot, the sprites do without them """
+        perpend = utils.get_perpendicular(direction)
+        return [
+            fin_point + direction * height,
+            fin_point + perpend * width,
+            fin_point - direction * height,
+            fin_point - perpend * width,
+        ]
 
-    def draw_fin_legs(self, index: int, delta_time: float):
+    def update_legs(self, delta_time: float):
+        for index in self.members_indices:
+            self.update_leg_pair(index, delta_time)
+
+    def update_leg_pair(self, index: int, delta_time: float):
         if index == 0:
             direction = self.body_direction
         else:
             direction = self.body_pos[index - 1] - self.body_pos[index]
             direction /= np.linalg.norm(direction)
 
-        perpend = utils.get_perpendicular(direction)
-        anchor_point_1 = self.body_pos[index] + perpend * self.body_size[index] * 0.8
-        support_point_1 = self.body_pos[index] + perpend * self.body_size[index] * 2 + direction * self.body_size[index] * 2
-        anchor_point_2 = self.body_pos[index] - perpend * self.body_size[index] * 0.8
-        support_point_2 = self.body_pos[index] - perpend * self.body_size[index] * 2 + direction * self.body_size[index] * 2
+        size = self.body_size[index]
+        self.perpend[0] = direction[1]
+        self.perpend[1] = -direction[0]
+        anchor_point_1, anchor_point_2, support_point_1, support_point_2 = self.leg_points[index]
+        anchor_point_1[:] = self.perpend
+        anchor_point_1 *= size * 0.8
+        np.subtract(self.body_pos[index], anchor_point_1, out=anchor_point_2)
+        anchor_point_1 += self.body_pos[index]
+        np.multiply(direction, size * 2, out=self.steer)
+        self.steer += self.body_pos[index]
+        np.multiply(self.perpend, size * 2, out=support_point_1)
+        np.subtract(self.steer, support_point_1, out=support_point_2)
+        support_point_1 += self.steer
 
         old_anchor_1 =  self.legs[index][0].get_objective()
         old_anchor_2 =  self.legs[index][1].get_objective()
@@ -285,11 +464,17 @@ class ProceduralCreature:
             new_anchor_2 = None
         else: new_anchor_2 = support_point_2
 
-        self.legs[index][0].move_tentacle_to(anchor_point_1)
-        self.legs[index][1].move_tentacle_to(anchor_point_2)
+        epsilon = self.settings.SLEEP_EPSILON
+        self.legs[index][0].move_tentacle_to(anchor_point_1, epsilon)
+        self.legs[index][1].move_tentacle_to(anchor_point_2, epsilon)
 
-        self.legs[index][0].point_towards(delta_time, new_anchor_1)
-        self.legs[index][1].point_towards(delta_time, new_anchor_2)
+        self.legs[index][0].point_towards(delta_time, new_anchor_1, epsilon)
+        self.legs[index][1].point_towards(delta_time, new_anchor_2, epsilon)
+
+    def draw_fin_legs(self, index: int):
+        support_point_1, support_point_2 = self.leg_points[index][2:]
+        old_anchor_1 = self.legs[index][0].get_objective()
+        old_anchor_2 = self.legs[index][1].get_objective()
 
         points_1 = self.legs[index][0].get_drawing_points()
         points_2 = self.legs[index][1].get_drawing_points()
@@ -297,15 +482,37 @@ class ProceduralCreature:
         if self.settings.DEBUGGING_MODE:
             self.draw_debug_points([support_point_1, support_point_2])
             self.draw_debug_points([old_anchor_1, old_anchor_2], size=5, color=Colors.GREEN)
-            self.draw_debug_points(points_1 + points_2, size=3, color=Colors.LIGHT_BLUE)
+            self.draw_debug_points(points_1, size=3, color=Colors.LIGHT_BLUE)
+            self.draw_debug_points(points_2, size=3, color=Colors.LIGHT_BLUE)
             self.legs[index][0].render(draw_joint=self.settings.DEBUGGING_MODE, thickness=2)
             self.legs[index][1].render(draw_joint=self.settings.DEBUGGING_MODE, thickness=2)
         else:
-            self.draw_smooth_points(points_1, self.n_points_smooth, self.color_contrast)
-            self.draw_smooth_points(points_2, self.n_points_smooth, self.color_contrast)
+            self.draw_smooth_points(points_1, self.leg_points_smooth, self.color_contrast,
+                                    part=('leg', index, 0), version=self.legs[index][0].version)
+            self.draw_smooth_points(points_2, self.leg_points_smooth, self.color_contrast,
+                                    part=('leg', index, 1), version=self.legs[index][1].version)
+
+    def generate_legs(self, positions: list[int], leg_state: tuple[np.ndarray, ...] = None):
+        """
+        :param leg_state: joints, angles, objectives and asleep of the tentacles (see get_leg_state),
+                          the legs are rebuilt around them instead of being placed along the body
+        """
+        # Legs keep the proportions of the unscaled body
+        total_length = sum(self.original_body_size.tolist()) / self.n
+        width = total_length * 0.25
+        if leg_state is not None:
+            joints, angles, objectives, asleep = leg_state
+            asleep = asleep.tolist()
+            for k, pos in enumerate(positions):
+                self.legs[pos] = [
+                    kl.Tentacle.from_state(
+                        self.screen, joints[t], angles[t], objectives[t], total_length, width,
+                        smooth_factor=0.1, color=self.color_contrast, asleep=asleep[t]
+                    )
+                    for t in (2 * k, 2 * k + 1)
+                ]
+            return
 
-    def generate_legs(self, positions: list[int]):
-        width = self.avg_body_size * 0.25
         for pos in positions:
             if pos == 0:
                 direction = self.body_direction
@@ -325,46 +532,84 @@ class ProceduralCreature:
                     screen=self.screen,
                     pos=point,
                     n_limbs=2,
-                    total_length=self.avg_body_size,
+                    total_length=total_length,
                     thickness=width,
                     smooth_factor=0.1,
                     color=self.color_contrast,
                     shorten_first_limb=False
                 ))
 
-    def start_body_pos(self, ):
-        positions = [self.body_pos[0]]
-        for i, size in enumerate(self.body_size[1:]):  # Starts in 0 so is like "i-1"
-            positions +=  [np.array([positions[i][0], positions[i][1] - size*2])]
-        self.body_pos = np.array(positions)
+    def start_body_pos(self):
+        """ Straight body hanging down from the head, every part two sizes below the previous one """
+        head = self.body_pos[0]
+        body_pos = np.empty((self.n, 2))
+        body_pos[:, 0] = head[0]
+        # Subtracted one part after the other, like walking down the body
+        np.subtract.accumulate(np.concatenate(([head[1]], self.body_size[1:] * 2)), out=body_pos[:, 1])
+        self.body_pos = body_pos
+
+    def get_links(self) -> np.ndarray:
+        """ Distance every part keeps to the previous one """
+        if self.settings.OVERLAP_BODY:
+            # NOT OVER-LAPPING BODY
+            return np.add(self.body_size[1:], self.body_size[:-1], out=self.links)
+        return np.maximum(self.body_size[1:], self.body_size[:-1], out=self.links)
+
+    def get_reach(self) -> float:
+        """
+        How far from the head anything of the creature can be drawn: the whole chain stretched out,
+        the tail fin behind it and the widest part around it. Creatures are culled by their head with it.
+        """
+        links = (self.settings.OVERLAP_BODY, self.settings.FISH_SIZE)
+        if links != self.reach_links:
+            size = float(self.body_size.max())
+            leg_length = sum(self.original_body_size.tolist()) / self.n
+            # Head, lateral fins and legs (anchored 0.8 sizes aside, as long as the average unscaled
+            # size and a quarter of it thick), whichever sticks out the most
+            width = max(1.25 * size, size + 0.75 * self.avg_body_size, 0.8 * size + 1.25 * leg_length)
+            self.reach = float(self.get_links().sum()) + self.avg_body_size * TAIL_FIN_LENGTH + width
+            self.reach_links = links
+        # The tip of the tail fin is pushed aside by the bend of the body
+        return self.reach + abs(self.angle_dif)
 
     def update_body_pos(self):
-        for i in range(1, self.n):
-            direction = self.body_pos[i-1] - self.body_pos[i]
-            dist = np.linalg.norm(direction)
-            direction /= dist
-            if self.settings.OVERLAP_BODY:
-                # NOT OVER-LAPPING BODY
-                dist -= (self.body_size[i] + self.body_size[i-1])
-            else:
-                if self.body_size[i] >= self.body_size[i-1]:
-                    dist -= self.body_size[i]
-                else:
-                    dist -= self.body_size[i - 1]
-
-            self.body_pos[i] += direction * dist # Dist is how much the boyd has to be moved
-
-    def follow_mouse(self, delta_time: float):
-        x, y = py.mouse.get_pos()
-        # self.point_towards((x, y), delta_time)
-        self.move_towards((x, y), delta_time)
-
-    def move_towards(self, point: utils.point_type, delta_time: float):
-        noise = np.random.uniform(-1e-2,1e-2)
-        direction = self.body_direction + noise + (point - self.body_pos[0]) * delta_time * self.settings.SMOOT_FACTOR
-        direction /= np.linalg.norm(direction)
-        self.body_direction = direction
-        self.body_pos[0] += self.body_direction * delta_time * self.settings.MOVING_SPEED
+        kernels.backend.solve_chain(self.body_pos, self.get_links())
+
+    def move_towards(self, point: utils.point_type, delta_time: float, noise: float = 0.0):
+        """
+        :param noise: steering noise for this step, drawn by the owner of the random generator (see Swarm.step)
+        """
+        self.target = utils.parse_point(point)
+        np.subtract(self.target, self.body_pos[0], out=self.steer)
+        self.steer *= delta_time
+        self.steer *= self.settings.SMOOT_FACTOR
+        self.body_direction += noise
+        self.body_direction += self.steer
+        self.body_direction /= np.linalg.norm(self.body_direction)
+        np.multiply(self.body_direction, delta_time, out=self.steer)
+        self.steer *= self.settings.MOVING_SPEED
+        self.body_pos[0] += self.steer
         self.update_eyes_pos()
 
-        self.update_body_pos()
\ No newline at end of file
+        self.asleep = not self.has_moved()
+        if not self.asleep:
+            self.update_body_pos()
+        if self.settings.DRAW_LEGS and not (self.asleep and all(leg.asleep for leg in self.tentacles())):
+            self.update_legs(delta_time)
+
+    def has_moved(self) -> bool:
+        """
+        Whether the head moved or turned more than SLEEP_EPSILON (px) since the last time it did.
+        While it does not the rest of the body is left where it is, it would barely move.
+        """
+        links = (self.settings.OVERLAP_BODY, self.settings.FISH_SIZE)
+        np.subtract(self.body_pos[0], self.settled_head, out=self.steer)
+        np.subtract(self.body_direction, self.settled_direction, out=self.perpend)
+        moved = np.abs(self.steer).max() + self.body_size[0] * np.abs(self.perpend).max()
+        if moved <= self.settings.SLEEP_EPSILON and links == self.settled_links:
+            return False
+        self.settled_head[:] = self.body_pos[0]
+        self.settled_direction[:] = self.body_direction
+        self.settled_links = links
+        self.version += 1
+        return True
\ No newline at end of file
@@ -0,0 +1,273 @@
+import numpy as np
+
+from src.utils import utils
+from src.classes.camera import Camera
+from src.settings.settings import Colors, color_type
+
+
+class PolygonBatch:
+    """
+    Software rasterizer for a whole frame: polygons are queued in drawing order and
+    `flush` scan-converts all of them at once with numpy, straight into the pixels of an image.
+    Outlines are turned into one quad per edge and filled the same way, so the per-call
+    cost of pygame is paid once per frame instead of once per polygon.
+    Filling follows the even-odd rule, sampling pixel centers.
+    """
+    def __init__(self):
+        self.points: list[np.ndarray] = []
+        self.colors: list[color_type] = []
+        self.widths: list[int] = []
+        self.winners = np.empty(0, dtype=np.int64)  # Queue index drawn last on every pixel, reused between frames
+
+    def __len__(self):
+        return len(self.points)
+
+    def clear(self):
+        self.points.clear()
+        self.colors.clear()
+        self.widths.clear()
+
+    def polygon(self, color: color_type, points: np.ndarray, width: int = 0):
+        """
+        :param points: (k, 2) vertices in pixels of the target surface, kept until the next flush
+        :param width: outline width in pixels, 0 fills the polygon
+        """
+        if len(points) > 2:
+            self.points.append(points)
+            self.colors.append(color)
+            self.widths.append(width)
+
+    def circle(self, color: color_type, center: np.ndarray, radius: float, width: int = 0):
+        """ Queued as a regular polygon fine enough for its radius """
+        n = int(np.clip(np.ceil(2 * np.pi * radius / 3), 8, 64))
+        angles = np.linspace(0, 2 * np.pi, n, endpoint=False)
+        points = np.empty((n, 2))
+        points[:, 0] = np.cos(angles)
+        points[:, 1] = np.sin(angles)
+        points *= radius - width / 2 if width else radius
+        points += center
+        self.polygon(color, points, width)
+
+    # =================== RASTERIZATION ===================
+    @staticmethod
+    def following(counts: np.ndarray) -> np.ndarray:
+        """
+        :param counts: vertices of every polygon, stored one after the other
+        :return: index of the vertex every vertex is joined to, the last one of a polygon goes back to its first
+        """
+        starts = (np.cumsum(counts) - counts)[counts > 0]
+        following = np.arange(1, counts.sum() + 1)
+        following[starts + counts[counts > 0] - 1] = starts
+        return following
+
+    @classmethod
+    def decimate(cls, vertices: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Drops every vertex in the same half pixel as the previous one of its polygon, zoomed out
+        shapes are mostly made of those and they change nothing once rasterized
+        :return: the vertices and counts left
+        """
+        cells = np.floor(vertices * 2)
+        previous = np.empty(len(vertices), dtype=np.int64)
+        previous[cls.following(counts)] = np.arange(len(vertices))
+        keep = np.any(cells != cells[previous], axis=1)
+        polygon = np.repeat(np.arange(len(counts)), counts)
+        return vertices[keep], np.bincount(polygon[keep], minlength=len(counts))
+
+    def outline_quads(self, order: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        One quad per edge of every outline, extended by half the width at both ends so corners are closed.
+        :param order: index of the outlines in the queue
+        :return: quad vertices (q, 4, 2) and the queue index of every quad
+        """
+        a, counts = self.decimate(
+            np.concatenate([self.points[i] for i in order]), np.array([len(self.points[i]) for i in order])
+        )
+        b = a[self.following(counts)]
+        owner = np.repeat(order, counts)
+        half = np.array(self.widths, dtype=float)[owner] / 2
+
+        direction = b - a
+        length = np.hypot(direction[:, 0], direction[:, 1])
+        np.divide(direction, length[:, None], out=direction, where=length[:, None] > 0)
+        direction[length == 0] = 0
+        direction *= half[:, None]
+        normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+
+        a -= direction
+        b += direction
+        quads = np.stack([a + normal, b + normal, b - normal, a - normal], axis=1)
+        return quads, owner
+
+    def spans(self, size: tuple[int, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Scan-converts the queue.
+        :param size: (width, height) of the target surface, everything outside is clipped
+        :return: row, first column, last column and queue index of every horizontal span,
+                 sorted in drawing order
+        """
+        width, height = size
+        widths = np.array(self.widths)
+        filled = np.flatnonzero(widths == 0)
+        outlined = np.flatnonzero(widths > 0)
+
+        polygons, counts, owners = [], [], []
+        if len(filled):
+            vertices, filled_counts = self.decimate(
+                np.concatenate([self.points[i] for i in filled]), np.array([len(self.points[i]) for i in filled])
+            )
+            polygons.append(vertices)
+            counts.append(filled_counts)
+            owners.append(filled)
+        if len(outlined):
+            quads, quad_owner = self.outline_quads(outlined)
+            polygons.append(quads.reshape(-1, 2))
+            counts.append(np.full(len(quads), 4))
+            owners.append(quad_owner)
+        owner = np.concatenate(owners)  # Queue index of every polygon
+        counts = np.concatenate(counts)
+        # Polygons ranked in drawing order, outline quads take the place of their outline
+        by_rank = np.argsort(owner, kind='stable')
+        rank = np.empty(len(owner), dtype=np.int64)
+        rank[by_rank] = np.arange(len(owner))
+
+        # Every vertex is joined to the next one of its polygon, the last one to the first
+        vertices = np.concatenate(polygons)
+        edge_polygon = np.repeat(rank, counts)
+
+        p0, p1 = vertices, vertices[self.following(counts)]
+        upwards = p0[:, 1] > p1[:, 1]
+        low = np.where(upwards[:, None], p1, p0)
+        high = np.where(upwards[:, None], p0, p1)
+
+        # Rows whose pixel center (y + 0.5) is in [low, high) of the edge
+        first = np.ceil(low[:, 1] - 0.5).clip(0, height).astype(np.int64)
+        last = np.ceil(high[:, 1] - 0.5).clip(0, height).astype(np.int64)
+        n_rows = last - first
+        crossing = n_rows > 0
+        first, n_rows = first[crossing], n_rows[crossing]
+        low, high, edge_polygon = low[crossing], high[crossing], edge_polygon[crossing]
+
+        edge = np.repeat(np.arange(len(n_rows)), n_rows)
+        rows = first[edge] + np.arange(len(edge)) - np.repeat(np.cumsum(n_rows) - n_rows, n_rows)
+        slope = (high[:, 0] - low[:, 0]) / (high[:, 1] - low[:, 1])
+        xs = low[edge, 0] + (rows + 0.5 - low[edge, 1]) * slope[edge]
+        polygon = edge_polygon[edge]
+
+        # Crossings of a polygon on a row come in pairs, each pair bounds a span.
+        # Sorted by rank, row and x with a single key (x is clipped, spans are anyway, so it fits),
+        # which leaves the spans in drawing order
+        np.clip(xs, -1, width + 1, out=xs)
+        key = (polygon * height + rows) * float(width + 3) + (xs + 1)
+        sort = np.argsort(key)
+        xs, rows, polygon = xs[sort], rows[sort], polygon[sort]
+        x0 = np.ceil(xs[0::2] - 0.5).clip(0, width).astype(np.int64)
+        x1 = np.ceil(xs[1::2] - 0.5).clip(0, width).astype(np.int64) - 1
+        rows, queue = rows[0::2], owner[by_rank][polygon[0::2]]
+
+        inside = x1 >= x0
+        return rows[inside], x0[inside], x1[inside], queue[inside]
+
+    def flush(self, pixels: np.ndarray, values: np.ndarray):
+        """
+        Draws everything queued and empties the queue
+        :param pixels: (height, width) or (height, width, channels) image, modified in place
+        :param values: pixel value of every queued polygon, in queue order
+        """
+        if not self.points:
+            return
+        height, width = pixels.shape[:2]
+        rows, x0, x1, queue = self.spans((width, height))
+        lengths = x1 - x0 + 1
+        # Row-major position of every pixel of every span
+        index = np.repeat(rows * width + x0 - (np.cumsum(lengths) - lengths), lengths)
+        index += np.arange(len(index))
+        owner = np.repeat(queue, lengths)
+
+        # The polygon drawn last wins like with pygame. Which of repeated indices a fancy assignment
+        # keeps is not defined, so the winner of every pixel is found first and only it is written
+        # (the quads of an outline may still overlap each other, with the same value)
+        if len(self.winners) != height * width:
+            self.winners = np.empty(height * width, dtype=np.int64)
+        self.winners[index] = -1
+        np.maximum.at(self.winners, index, owner)
+        drawn = self.winners[index] == owner
+        index = index[drawn]
+        values = values[owner[drawn]]
+        if pixels.flags.c_contiguous:
+            pixels.reshape((height * width,) + pixels.shape[2:])[index] = values
+        else:
+            pixels[index // width, index % width] = values
+        self.clear()
+
+
+class BatchedBackend:
+    """
+    Display list backend that queues the shapes of the frame into a PolygonBatch and fills them all
+    at once in `finish`. Subclasses map world coordinates to pixels (to_screen, to_length, to_width).
+    """
+    def __init__(self):
+        self.batch = PolygonBatch()
+
+    def polygon(self, color: color_type, points, width: int = 0):
+        self.batch.polygon(color, self.to_screen(points), self.to_width(width))
+
+    def circle(self, color: color_type, center: utils.point_type, radius: float, width: int = 0):
+        self.batch.circle(color, self.to_screen(center), self.to_length(radius), self.to_width(width))
+
+    def sprite(self, key: tuple, points: np.ndarray, color: color_type, angle: float,
+               center: utils.point_type, outline: int = 3):
+        # Rotating the points is cheaper than caching anything here
+        rotated = utils.rotate_points(points, angle)
+        rotated += center
+        self.polygon(color, rotated)  # Fill
+        if outline:
+            self.polygon(Colors.WHITE, rotated, outline)  # Shape
+
+
+class RasterBackend(BatchedBackend):
+    """
+    Display list backend made of numpy only: rasterizes into `image` (height, width, 3),
+    for headless runs and tests. Sprites are drawn as rotated polygons and texts are only kept
+    in `texts`, there is no font rasterizer.
+    """
+    name = 'numpy'
+
+    def __init__(self, size: tuple[int, int], camera: Camera = None):
+        """
+        :param size: (width, height) of the image in pixels
+        :param camera: without one the world is in image pixels
+        """
+        super().__init__()
+        width, height = size
+        self.image = np.zeros((height, width, 3), dtype=np.uint8)
+        self.half_size = np.array(size, dtype=float) / 2
+        self.camera = Camera(self.half_size) if camera is None else camera
+        self.texts: list[tuple[str, utils.point_type, color_type, int]] = []
+
+    # =================== COORDINATES ===================
+    def to_screen(self, points) -> np.ndarray:
+        """ World coordinates -> pixels of the image """
+        points = np.asarray(points, dtype=float) - self.camera.center
+        points *= self.camera.zoom
+        points += self.half_size
+        return points
+
+    def to_length(self, length: float) -> float:
+        return length * self.camera.zoom
+
+    def to_width(self, width: int) -> int:
+        """ Outline widths never go below one pixel, 0 still means filled """
+        return width if width == 0 else max(1, round(width * self.camera.zoom))
+
+    # =================== PRIMITIVES ===================
+    def fill(self, color: color_type):
+        self.image[:] = color
+        self.batch.clear()
+        self.texts.clear()
+
+    def text(self, text: str, pos: utils.point_type, color: color_type, size: int):
+        self.texts.append((text, pos, color, size))
+
+    def finish(self):
+        self.batch.flush(self.image, np.array(self.batch.colors, dtype=np.uint8).reshape(-1, 3))
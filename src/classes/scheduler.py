@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class UpdateScheduler:
+    """
+    Temporal level of detail: decides every frame which creatures are simulated.
+    Visible and moving creatures update every frame, idle or off-screen ones every few frames.
+    Creatures sharing an interval are spread over its frames (by index) so the load stays even,
+    and the time a creature skipped is handed back to it on its next update.
+    """
+    def __init__(self, max_interval: int = 8, idle_speed: float = 0.05, max_step: float = 64):
+        """
+        :param max_interval: frames between two updates of a creature far away from the view
+        :param idle_speed: px/ms under which a visible creature counts as idle
+        :param max_step: longest time step (ms) given to a creature at once, longer ones are split
+        """
+        self.max_interval = max_interval
+        self.idle_speed = idle_speed
+        self.max_step = max_step
+        self.reset()
+
+    def reset(self):
+        self.frame = 0
+        self.pending = np.zeros(0)  # Time (ms) since the last update of every creature
+        self.speeds = np.zeros(0)
+        self.fresh = np.zeros(0, dtype=bool)  # Never updated yet, they are due right away
+        self.intervals = np.ones(0, dtype=int)
+        self.updated = 0
+        self.skipped = 0
+
+    def resize(self, n: int):
+        """ Creatures are only added or removed at the end, new ones start as moving """
+        old = len(self.pending)
+        self.pending = np.resize(self.pending, n)
+        self.speeds = np.resize(self.speeds, n)
+        self.fresh = np.resize(self.fresh, n)
+        if n > old:
+            self.pending[old:] = 0
+            self.speeds[old:] = np.inf
+            self.fresh[old:] = True
+
+    def plan(self, heads: np.ndarray, delta_time: float, view: tuple[float, float, float, float],
+             reaches: np.ndarray = None) -> np.ndarray:
+        """
+        :param heads: (n, 2) head of every creature
+        :param view: visible world rectangle (x0, y0, x1, y1)
+        :param reaches: (n,) how far from its head every creature extends (see ProceduralCreature.get_reach),
+                        a long body can cross the view with its head far away
+        :return: boolean mask of the creatures that have to be updated this frame
+        """
+        n = len(heads)
+        if n != len(self.pending):
+            self.resize(n)
+        x0, y0, x1, y1 = view
+        w, h = x1 - x0, y1 - y0
+        x, y = heads[:, 0], heads[:, 1]
+        r = 0 if reaches is None else reaches
+        # A bit of margin so creatures entering the view are already at full rate
+        visible = (x > x0 - w * 0.1 - r) & (x < x1 + w * 0.1 + r) & (y > y0 - h * 0.1 - r) & (y < y1 + h * 0.1 + r)
+        near = (x > x0 - w - r) & (x < x1 + w + r) & (y > y0 - h - r) & (y < y1 + h + r)
+
+        self.intervals = np.where(
+            visible,
+            np.where(self.speeds > self.idle_speed, 1, 2),
+            np.where(near, 4, self.max_interval)
+        ).clip(1, self.max_interval)
+        self.pending += delta_time
+        due = ((self.frame + np.arange(n)) % self.intervals == 0) | self.fresh
+        self.frame += 1
+
+        self.updated = int(np.count_nonzero(due))
+        self.skipped = n - self.updated
+        return due
+
+    def take(self, i: int) -> list[float]:
+        """
+        Time steps the i-th creature has to run now, all the time it skipped split in steps of at most max_step
+        """
+        elapsed = self.pending[i]
+        self.pending[i] = 0
+        self.fresh[i] = False
+        n_steps = max(1, int(np.ceil(elapsed / self.max_step)))
+        return [elapsed / n_steps] * n_steps
+
+    def record(self, i: int, distance: float, elapsed: float):
+        """ How far the i-th creature moved in its last update """
+        self.speeds[i] = distance / elapsed if elapsed > 0 else 0
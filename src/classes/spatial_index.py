@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class ChunkGrid:
+    """
+    Spatial index of the creatures: the world is split in square chunks and every
+    creature is stored in the chunk of its head, together with how far from it the creature reaches.
+    Only the chunks overlapping a rectangle (grown by the longest reach) are visited by `query`,
+    so its cost depends on what is in the rectangle, not on the world.
+    """
+    def __init__(self, chunk_size: float = 512):
+        self.chunk_size = chunk_size
+        self.chunks: dict[tuple[int, int], set[int]] = {}
+        self.cells = np.zeros((0, 2), dtype=int)  # Chunk of every item
+        self.positions = np.zeros((0, 2))
+        self.reaches = np.zeros(0)  # Distance from its position every item extends to
+
+    def __len__(self):
+        return len(self.cells)
+
+    def clear(self):
+        self.chunks.clear()
+        self.cells = np.zeros((0, 2), dtype=int)
+        self.positions = np.zeros((0, 2))
+        self.reaches = np.zeros(0)
+
+    def update(self, positions: np.ndarray, reaches: np.ndarray = None):
+        """
+        Re-indexes the items, only the ones that changed chunk are moved.
+        Items are only added or removed at the end, like in the Swarm.
+        :param positions: (n, 2) position of every item
+        :param reaches: (n,) how far from its position every item extends, 0 without it
+        """
+        n, old = len(positions), len(self.cells)
+        for i in range(n, old):
+            self._discard(i, self.cells[i])
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        self.positions = positions
+        self.reaches = np.zeros(n) if reaches is None else np.asarray(reaches, dtype=float)
+        cells = np.floor(positions / self.chunk_size).astype(int)
+
+        kept = min(n, old)
+        changed = np.flatnonzero(np.any(cells[:kept] != self.cells[:kept], axis=1))
+        for i in changed:
+            self._discard(i, self.cells[i])
+            self.chunks.setdefault((int(cells[i, 0]), int(cells[i, 1])), set()).add(int(i))
+        for i in range(kept, n):
+            self.chunks.setdefault((int(cells[i, 0]), int(cells[i, 1])), set()).add(int(i))
+        self.cells = cells
+
+    def _discard(self, i: int, cell: np.ndarray):
+        key = (int(cell[0]), int(cell[1]))
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            chunk.discard(i)
+            if not chunk:
+                del self.chunks[key]
+
+    def query(self, rect: tuple[float, float, float, float], margin: float = 0) -> list[int]:
+        """
+        :param rect: world rectangle (x0, y0, x1, y1)
+        :param margin: grows the rectangle
+        :return: sorted indices of the items that reach into the rectangle
+        """
+        x0, y0, x1, y1 = rect
+        # Chunks far enough to hold the item reaching the furthest, the others are filtered below
+        reach = margin + (float(self.reaches.max()) if len(self.reaches) else 0.0)
+        cx0, cy0 = int(np.floor((x0 - reach) / self.chunk_size)), int(np.floor((y0 - reach) / self.chunk_size))
+        cx1, cy1 = int(np.floor((x1 + reach) / self.chunk_size)), int(np.floor((y1 + reach) / self.chunk_size))
+
+        found: list[int] = []
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) <= len(self.chunks):
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    found.extend(self.chunks.get((cx, cy), ()))
+        else:
+            # Zoomed far out: fewer chunks exist than the rectangle covers
+            for (cx, cy), chunk in self.chunks.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    found.extend(chunk)
+        found.sort()
+
+        if not found:
+            return found
+        x, y = self.positions[found].T
+        reaches = self.reaches[found] + margin
+        inside = (x >= x0 - reaches) & (x <= x1 + reaches) & (y >= y0 - reaches) & (y <= y1 + reaches)
+        return [i for i, keep in zip(found, inside.tolist()) if keep]
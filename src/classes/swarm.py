@@ -0,0 +1,250 @@
+import dataclasses
+import gc
+import numpy as np
+
+from src.utils import utils, snapshot
+from src.classes import procedural_animals as pa
+from src.classes.scheduler import UpdateScheduler
+from src.classes.spatial_index import ChunkGrid
+from src.settings.settings import Settings, get_rgb_iterator
+
+# Settings that belong to the display the snapshot is loaded on, not to the world
+DISPLAY_SETTINGS = ('RUNNING', 'WIDTH', 'HEIGHT', 'SCREEN_CENTER')
+SNAPSHOT_ARRAYS = (
+    'parts', 'body_pos', 'body_size', 'direction', 'target', 'eyes', 'colors', 'settled', 'bend',
+    'legs', 'leg_joints', 'leg_angles', 'leg_objectives', 'leg_asleep', 'pending', 'speeds', 'fresh'
+)
+
+
+class Swarm:
+    """
+    Owns every creature of the simulation together with the random generator
+    used to spawn and steer them.
+    Given the same seed and the same sequence of (point, delta_time) inputs the
+    trajectories are bit-identical, so runs can be replayed and compared.
+    """
+    def __init__(self, screen, settings: Settings, seed: int = None):
+        self.screen = screen
+        self.settings = settings
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.creatures: list[pa.ProceduralCreature] = []
+        self.scheduler = UpdateScheduler(settings.LOD_MAX_INTERVAL, settings.LOD_IDLE_SPEED, settings.LOD_MAX_STEP)
+        self.index = ChunkGrid(settings.CHUNK_SIZE)
+        self.fish_size = settings.FISH_SIZE
+        self.drawn = 0
+        self.mapped = False  # Creatures still view the arrays of a loaded snapshot
+
+    def __len__(self):
+        return len(self.creatures)
+
+    def __iter__(self):
+        return iter(self.creatures)
+
+    def new_creature(self, pos: utils.point_type, color_base, color_contrast) -> pa.ProceduralCreature:
+        creature = pa.ProceduralCreature(
+            self.screen,
+            pos,
+            np.log(self.settings.N_PARTS - np.arange(self.settings.N_PARTS) + 1) * self.settings.FISH_REFERENCE_SIZE,
+            # [50, 40, 30, 40, 30, 40, 30, 25, 20, 20, 15, 10, 5, 5],
+            color_base, color_contrast,
+            self.settings
+        )
+        creature.update_settings(self.settings)
+        return creature
+
+    def spawn_positions(self, n: int) -> np.ndarray:
+        center = np.array(self.settings.SCREEN_CENTER, dtype=float)
+        return center + self.rng.uniform(-self.settings.WORLD_RADIUS, self.settings.WORLD_RADIUS, (n, 2))
+
+    def reset(self, seed: int = None):
+        """
+        Throws away every creature and spawns N_ANIMALS new ones.
+        :param seed: if given, the generator is re-seeded first so the new swarm is reproducible
+        """
+        if seed is not None:
+            self.seed = seed
+            self.rng = np.random.default_rng(seed)
+
+        n = self.settings.N_ANIMALS
+        self.scheduler.reset()
+        self.creatures = [
+            self.new_creature(pos, color_base, color_contrast)
+            for pos, color_base, color_contrast in
+                zip(self.spawn_positions(n), get_rgb_iterator(n, 0.75), get_rgb_iterator(n, 1))
+        ]
+        self.index.clear()
+        self.index.update(self.heads(), self.reaches())
+
+    def add(self, n: int):
+        indices = self.rng.permutation(self.settings.N_ANIMALS)[:n]
+        color_base_list = get_rgb_iterator(self.settings.N_ANIMALS, 0.75)
+        color_contrast_list = get_rgb_iterator(self.settings.N_ANIMALS, 1)
+
+        self.creatures += [
+            self.new_creature(pos, color_base_list[i], color_contrast_list[i])
+            for pos, i in zip(self.spawn_positions(len(indices)), indices)
+        ]
+        self.index.update(self.heads(), self.reaches())
+
+    def remove(self, n: int):
+        if n > 0:
+            self.creatures = self.creatures[:-n]
+            self.index.update(self.heads(), self.reaches())
+
+    def save(self, path: str, extra: dict = None):
+        """
+        Writes the whole world to a snapshot: settings, generator state, scheduler and every creature.
+        :param extra: anything else JSON can store (like the camera), given back by `load`
+        """
+        if self.mapped:
+            # Windows can not replace a file that is mapped, and it may be the one being written
+            self.detach()
+        creatures = self.creatures
+        self.scheduler.resize(len(creatures))
+        leg_states = [creature.get_leg_state() for creature in creatures]
+        header = {
+            'settings': dataclasses.asdict(self.settings),
+            'seed': self.seed,
+            'rng': self.rng.bit_generator.state,
+            'frame': self.scheduler.frame,
+            'extra': extra or {},
+        }
+
+        def stack(arrays: list[np.ndarray], shape: tuple) -> np.ndarray:
+            return np.concatenate(arrays) if arrays else np.zeros(shape)
+
+        snapshot.write(path, header, {
+            'parts': np.array([creature.n for creature in creatures], dtype=np.int64),
+            'body_pos': stack([creature.body_pos for creature in creatures], (0, 2)),
+            'body_size': stack([creature.original_body_size for creature in creatures], (0,)),
+            'direction': np.array([creature.body_direction for creature in creatures]).reshape(-1, 2),
+            'target': np.array([creature.target for creature in creatures], dtype=float).reshape(-1, 2),
+            'eyes': np.array([(creature.eyes.pos1, creature.eyes.pos2) for creature in creatures]).reshape(-1, 2, 2),
+            'colors': np.array(
+                [(creature.color_base, creature.color_contrast) for creature in creatures], dtype=np.uint8
+            ).reshape(-1, 2, 3),
+            'settled': np.array([creature.get_sleep_state() for creature in creatures]).reshape(-1, 3, 2),
+            'bend': np.array([creature.angle_dif for creature in creatures], dtype=float),
+            'legs': np.array([len(joints) for joints, _, _, _ in leg_states], dtype=np.int64),
+            'leg_joints': stack([joints for joints, _, _, _ in leg_states], (0, 2, 2)),
+            'leg_angles': stack([angles for _, angles, _, _ in leg_states], (0, 2)),
+            'leg_objectives': stack([objectives for _, _, objectives, _ in leg_states], (0, 2)),
+            'leg_asleep': stack([asleep for _, _, _, asleep in leg_states], (0,)).astype(bool),
+            'pending': self.scheduler.pending,
+            'speeds': self.scheduler.speeds,
+            'fresh': self.scheduler.fresh,
+        })
+
+    def detach(self):
+        """ Copies everything still viewing a loaded snapshot, the file is unmapped once nothing uses it """
+        for creature in self.creatures:
+            creature.detach()
+        self.scheduler.pending = self.scheduler.pending.copy()
+        self.scheduler.speeds = self.scheduler.speeds.copy()
+        self.scheduler.fresh = self.scheduler.fresh.copy()
+        self.mapped = False
+
+    @classmethod
+    def load(cls, path: str, screen, settings: Settings) -> tuple['Swarm', dict]:
+        """
+        Rebuilds the world saved by `save`. The creature and leg arrays are views of the mapped snapshot,
+        nothing is copied (see `detach`).
+        :param settings: updated in place with the saved ones, except the DISPLAY_SETTINGS
+        :return: the swarm and the `extra` it was saved with
+        """
+        header, arrays = snapshot.read(path)
+        missing = set(SNAPSHOT_ARRAYS) - set(arrays)
+        if missing:
+            raise ValueError(f"'{path}' is missing {sorted(missing)}")
+        for name, value in header['settings'].items():
+            if name not in DISPLAY_SETTINGS and hasattr(settings, name):
+                setattr(settings, name, tuple(value) if isinstance(value, list) else value)
+
+        swarm = cls(screen, settings, header['seed'])
+        swarm.rng.bit_generator.state = header['rng']
+
+        parts = np.concatenate(([0], np.cumsum(arrays['parts'])))
+        legs = np.concatenate(([0], np.cumsum(arrays['legs'])))
+        body_pos, body_size = arrays['body_pos'], arrays['body_size']
+        leg_joints, leg_angles, leg_objectives = arrays['leg_joints'], arrays['leg_angles'], arrays['leg_objectives']
+        leg_asleep = arrays['leg_asleep']
+        # Thousands of objects that all stay alive, the collector would only slow their creation down
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            swarm.creatures = [
+                pa.ProceduralCreature.from_state(
+                    screen, body_pos[p0:p1], body_size[p0:p1], direction, target,
+                    tuple(color_base), tuple(color_contrast), settings, eyes,
+                    (leg_joints[l0:l1], leg_angles[l0:l1], leg_objectives[l0:l1], leg_asleep[l0:l1]),
+                    settled, bend
+                )
+                for p0, p1, l0, l1, direction, target, eyes, (color_base, color_contrast), settled, bend in zip(
+                    parts[:-1].tolist(), parts[1:].tolist(), legs[:-1].tolist(), legs[1:].tolist(),
+                    arrays['direction'], arrays['target'], arrays['eyes'], arrays['colors'].tolist(),
+                    arrays['settled'], arrays['bend'].tolist()
+                )
+            ]
+        finally:
+            if collecting:
+                gc.enable()
+
+        swarm.scheduler.frame = header['frame']
+        swarm.scheduler.pending = arrays['pending']
+        swarm.scheduler.speeds = arrays['speeds']
+        swarm.scheduler.fresh = arrays['fresh']
+        swarm.mapped = True
+        swarm.index.update(swarm.heads(), swarm.reaches())
+        return swarm, header['extra']
+
+    def heads(self) -> np.ndarray:
+        return np.array([creature.body_pos[0] for creature in self.creatures]).reshape(-1, 2)
+
+    def reaches(self) -> np.ndarray:
+        return np.array([creature.get_reach() for creature in self.creatures], dtype=float)
+
+    def step(self, point: utils.point_type, delta_time: float, view: tuple[float, float, float, float] = None):
+        """
+        Moves every creature towards the point. The steering noise of the whole
+        swarm is drawn in a single call so the generator advances the same way
+        every frame, no matter what each creature does with it.
+        :param view: visible world rectangle (x0, y0, x1, y1), with TEMPORAL_LOD creatures
+                     away from it or idle are updated less often
+        """
+        if self.settings.FISH_SIZE != self.fish_size:
+            self.fish_size = self.settings.FISH_SIZE
+            for creature in self.creatures:
+                creature.update_settings(self.settings)
+
+        noise = self.rng.uniform(-1e-2, 1e-2, len(self.creatures))
+        heads = self.heads()
+        if not self.settings.TEMPORAL_LOD or view is None:
+            self.scheduler.updated, self.scheduler.skipped = len(self.creatures), 0
+            self.scheduler.pending[:] = 0
+            for creature, creature_noise in zip(self.creatures, noise):
+                creature.move_towards(point, delta_time, creature_noise)
+        else:
+            due = self.scheduler.plan(heads, delta_time, view, self.reaches())
+            for i in np.flatnonzero(due):
+                creature = self.creatures[i]
+                steps = self.scheduler.take(i)
+                for k, step_time in enumerate(steps):
+                    creature.move_towards(point, step_time, noise[i] if k == 0 else 0.0)
+                self.scheduler.record(i, np.linalg.norm(creature.body_pos[0] - heads[i]), sum(steps))
+        self.index.update(self.heads(), self.reaches())
+
+    def visible(self, view: tuple[float, float, float, float]) -> list[int]:
+        """ Indices of the creatures that can be seen in the view, in drawing order """
+        # Creatures are indexed by their head and how far the rest of the body can trail behind it
+        return self.index.query(view)
+
+    def render(self, view: tuple[float, float, float, float] = None):
+        """
+        :param view: visible world rectangle (x0, y0, x1, y1), only the creatures in the chunks
+                     around it are drawn. Everything is drawn without it.
+        """
+        indices = range(len(self.creatures)) if view is None else self.visible(view)
+        for i in indices:
+            self.creatures[i].render()
+        self.drawn = len(indices)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 import matplotlib.colors as mcolors
 
 color_type = tuple[int,int,int]
@@ -33,9 +34,36 @@ class Settings:
     DRAW_EYES: bool = True
     DRAW_FINS: bool = True
     DRAW_LEGS: bool = False
+    FIN_SPRITES: bool = True  # Fins drawn from cached rotated sprites instead of a spline fit every frame
+    SPRITE_ANGLE_STEP: float = 3  # degrees
+    SPRITE_CACHE_BYTES: int = 128 * 2**20  # Memory of the rasterized sprites, the least recently used ones are dropped beyond it
 
     BACKGROUND_COLOR: color_type = Colors.LIGHT_GREY
     REFERENCE_FPS: int = 1200
+    SEED: Optional[int] = None  # None -> a fresh run every time
+    FIXED_DELTA_TIME: Optional[float] = None  # ms per step, set it to make runs independent of the frame rate
+
+    KERNEL_BACKEND: str = 'auto'  # 'numpy', 'numba' or 'auto' (numba when installed)
+
+    RENDER_SCALE: float = 1.0  # Fraction of the display resolution the creatures are rasterized at
+    DYNAMIC_RENDER_SCALE: bool = False
+    MIN_RENDER_SCALE: float = 0.25
+    FRAME_BUDGET: float = 1000 / 60  # ms, the dynamic render scale goes down when a frame takes longer
+    SMOOTH_UPSCALE: bool = True
+    BATCH_RASTER: bool = False  # Shapes of a frame are queued and filled together with numpy (see PolygonBatch)
+
+    TEMPORAL_LOD: bool = True  # Creatures off-screen or idle are simulated every few frames
+    LOD_MAX_INTERVAL: int = 8  # frames
+    LOD_IDLE_SPEED: float = 0.05  # px/ms
+    LOD_MAX_STEP: float = 64  # ms, longer catch-up steps are split
+
+    SNAPSHOT_PATH: str = 'world.snapshot'  # F5 saves the world here, F9 loads it back
+    RESUME_SNAPSHOT: bool = True  # Start from SNAPSHOT_PATH when it exists
+
+    SLEEP_EPSILON: float = 0.5  # px, bodies moving less and legs this close to their objective skip the IK, 0 only skips exact repeats
+
+    WORLD_RADIUS: float = 1000  # Creatures spawn up to this far from the screen center
+    CHUNK_SIZE: float = 512  # Side of the chunks of the visibility index
 
     WIDTH: float = 1024
     HEIGHT: float = 1024
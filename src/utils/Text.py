@@ -1,5 +1,3 @@
-import pygame as py
-
 class Text:
     def __init__(self, text: str, value: any, x: float, y: float, text_col: tuple = (255,255,255)):
         self.text = text
@@ -25,20 +23,20 @@ class Text:
 
 class TextManagement:
     def __init__(self, texts: dict, text_size: int = 15, show_text: bool = True):
-        self.text_font = py.font.SysFont("Arial", text_size)
+        self.text_size = text_size
         self.show_text = show_text
         for text_name, (value, x, y) in texts.items():
             setattr(self, text_name, Text(text_name, value, x, y))
 
     def render(self, screen, show_text: bool = True):
+        """
+        :param screen: display list (e.g. the canvas) the texts are added to, on top of everything else
+        """
         self.show_text = show_text
         if not show_text: return
         for attr_name, text_to_render in self.__dict__.items():
             if isinstance(text_to_render, Text):
-                img = self.text_font.render(
-                    str(text_to_render), True, text_to_render.text_col
-                )
-                screen.blit(img, text_to_render.pos)
+                screen.text(str(text_to_render), text_to_render.pos, text_to_render.text_col, self.text_size)
 
 """
 text: dict = {
@@ -47,5 +45,5 @@ text: dict = {
 }
 text_management: TextManagement = TextManagement(text)
 
-text_namagement.render()
+text_namagement.render(canvas)
 """
\ No newline at end of file
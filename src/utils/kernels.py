@@ -0,0 +1,363 @@
+"""
+Inner loops of the simulation that walk a chain one segment at a time.
+Every backend exposes the same static methods:
+
+    solve_chain(body_pos, links)                    -> None (in place)
+    body_outline(body_pos, body_size, direction, special_smoothing, out) -> (points, angle_dif)
+    forward_kinematics(joints, angles, lengths, first) -> None (in place)
+    point_towards(joints, angles, lengths, objective, delta_time, smooth_factor) -> None (in place)
+
+`NumpyKernels` is the reference, `NumbaKernels` is only available when numba is installed.
+The backend is chosen once at startup with `select` and used through `kernels.backend`.
+Run `python -m src.utils.kernels` to check the parity of every available backend.
+"""
+import math
+import warnings
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def outline_size(n: int, special_smoothing: bool = False) -> int:
+    """ Number of points `body_outline` returns for a body of n parts """
+    if n < 2:
+        return 5
+    return 8 + (n - 2) * (6 if special_smoothing else 2)
+
+
+class NumpyKernels:
+    name: str = 'numpy'
+
+    @staticmethod
+    def solve_chain(body_pos: np.ndarray, links: np.ndarray):
+        """
+        Distance constraint of the body: every part is pulled towards the previous one
+        until they are `links[i-1]` apart. Works for one body (n, 2) or a batch of them (..., n, 2).
+        """
+        if body_pos.ndim == 2:
+            # Every part needs the new position of the previous one, so a single body is walked
+            # on plain floats: the same operations, without the cost of an array per part
+            xs, ys = body_pos[:, 0].tolist(), body_pos[:, 1].tolist()
+            x, y = xs[0], ys[0]
+            for i, link in enumerate(links.tolist(), 1):
+                dx, dy = x - xs[i], y - ys[i]
+                dist = math.sqrt(dx * dx + dy * dy)
+                move = dist - link
+                x = xs[i] + dx / dist * move
+                y = ys[i] + dy / dist * move
+                xs[i], ys[i] = x, y
+            body_pos[:, 0] = xs
+            body_pos[:, 1] = ys
+            return
+        for i in range(1, body_pos.shape[-2]):
+            direction = body_pos[..., i - 1, :] - body_pos[..., i, :]
+            dist = np.linalg.norm(direction, axis=-1, keepdims=True)
+            direction /= dist
+            body_pos[..., i, :] += direction * (dist - links[..., i - 1, None])
+
+    @staticmethod
+    def body_outline(body_pos: np.ndarray, body_size: np.ndarray, direction: np.ndarray,
+                     special_smoothing: bool = False, out: np.ndarray = None) -> tuple[np.ndarray, float]:
+        """
+        Points around the body (head, both sides and tail) in drawing order and the
+        average bend between consecutive parts in degrees.
+        :param out: (outline_size(n, special_smoothing), 2) buffer the points are written to
+        """
+        n = len(body_pos)
+        if out is None:
+            out = np.empty((outline_size(n, special_smoothing), 2))
+        perpend = np.array([direction[1], -direction[0]])
+        out[0] = direction * body_size[0] + body_pos[0] - perpend * body_size[0] * 0.6
+        out[1] = direction * body_size[0] * 1.25 + body_pos[0]
+        out[2] = direction * body_size[0] + body_pos[0] + perpend * body_size[0] * 0.6
+        out[3] = perpend * body_size[0] + body_pos[0]
+        out[-1] = -perpend * body_size[0] + body_pos[0]
+        if n < 2:
+            return out, 0.0
+
+        directions = body_pos[:-1] - body_pos[1:]
+        directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+        previous = np.vstack([direction, directions[:-1]])
+        cos = np.clip(np.sum(directions * previous, axis=1), -1.0, 1.0)
+        cross = directions[:, 0] * previous[:, 1] - directions[:, 1] * previous[:, 0]
+        angle_dif = np.degrees(np.sum(cross * np.arccos(cos)) / (n - 1))
+
+        # Perpendiculars of the inner parts, the tail reuses the one of the last inner part
+        perpends = np.column_stack([directions[:, 1], -directions[:, 0]])
+        perpends = np.vstack([perpend, perpends[:-1]])
+        inner = slice(1, n - 1)
+        side = perpends[1:, None, :] * body_size[inner, None, None]
+        if special_smoothing:
+            size = body_size[inner, None]
+            along = directions[:-1] * size / 3
+            front = perpends[1:] * (size + body_size[:n - 2, None]) / 2
+            back = perpends[1:] * (size + body_size[2:, None]) / 2
+            side = np.stack([front, side[:, 0], back], axis=1)
+            offset = np.stack([along, np.zeros_like(along), -along], axis=1)
+        else:
+            offset = np.zeros_like(side)
+        center = body_pos[inner, None, :]
+        k = 4 + side.shape[0] * side.shape[1]  # Index of the tail
+        out[4:k] = (side + center + offset).reshape(-1, 2)
+        out[k + 3:-1] = (-side + center + offset).reshape(-1, 2)[::-1]
+
+        out[k] = perpends[-1] * body_size[-1] + body_pos[-1]
+        out[k + 1] = -directions[-1] * body_size[-1] + body_pos[-1]
+        out[k + 2] = -perpends[-1] * body_size[-1] + body_pos[-1]
+        return out, float(angle_dif)
+
+    @staticmethod
+    def forward_kinematics(joints: np.ndarray, angles: np.ndarray, lengths: np.ndarray, first: int = 1):
+        """ Places every joint from `first` on at the end of the previous limb """
+        for j in range(max(first, 1), len(joints)):
+            theta = angles[j - 1] * np.pi / 180
+            joints[j, 0] = joints[j - 1, 0] + lengths[j - 1] * np.cos(theta)
+            joints[j, 1] = joints[j - 1, 1] + lengths[j - 1] * np.sin(theta)
+
+    @staticmethod
+    def point_towards(joints: np.ndarray, angles: np.ndarray, lengths: np.ndarray, objective: np.ndarray,
+                      delta_time: float, smooth_factor: float):
+        """
+        One cyclic coordinate descent step: from the tip to the base every limb is rotated
+        a fraction of the angle that would put the (initial) tip on the objective.
+        """
+        n = len(joints)
+        theta = angles[-1] * np.pi / 180
+        head = joints[-1] + lengths[-1] * np.array([np.cos(theta), np.sin(theta)])
+        if np.array_equal(head, objective):
+            return
+        for i in range(n):
+            j = n - 1 - i
+            v1 = head - joints[j]
+            v2 = objective - joints[j]
+            cos_theta = np.clip(np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2)), -1.0, 1.0)
+            angle_deg = np.degrees(np.arccos(cos_theta))
+            cross_product = v1[0] * v2[1] - v1[1] * v2[0]
+            angles[j] += np.sign(cross_product) * angle_deg * delta_time * smooth_factor / (n - i + 2)
+            NumpyKernels.forward_kinematics(joints, angles, lengths, n - i)
+
+
+BACKENDS: dict[str, type] = {'numpy': NumpyKernels}
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _solve_chain(body_pos, links):
+        for b in range(body_pos.shape[0]):
+            for i in range(1, body_pos.shape[1]):
+                dx = body_pos[b, i - 1, 0] - body_pos[b, i, 0]
+                dy = body_pos[b, i - 1, 1] - body_pos[b, i, 1]
+                dist = np.sqrt(dx * dx + dy * dy)
+                move = (dist - links[b, i - 1]) / dist
+                body_pos[b, i, 0] += dx * move
+                body_pos[b, i, 1] += dy * move
+
+    @numba.njit(cache=True)
+    def _body_outline(body_pos, body_size, direction, special_smoothing, points):
+        n = body_pos.shape[0]
+        s0 = body_size[0]
+        px, py = direction[1], -direction[0]
+        hx, hy = body_pos[0, 0], body_pos[0, 1]
+        points[0, 0] = direction[0] * s0 + hx - px * s0 * 0.6
+        points[0, 1] = direction[1] * s0 + hy - py * s0 * 0.6
+        points[1, 0] = direction[0] * s0 * 1.25 + hx
+        points[1, 1] = direction[1] * s0 * 1.25 + hy
+        points[2, 0] = direction[0] * s0 + hx + px * s0 * 0.6
+        points[2, 1] = direction[1] * s0 + hy + py * s0 * 0.6
+        points[3, 0] = px * s0 + hx
+        points[3, 1] = py * s0 + hy
+        m = points.shape[0]
+        points[m - 1, 0] = -px * s0 + hx
+        points[m - 1, 1] = -py * s0 + hy
+        if n < 2:
+            return 0.0
+
+        per_part = 3 if special_smoothing else 1
+        prev_x, prev_y = direction[0], direction[1]
+        total = 0.0
+        k = 4
+        for i in range(1, n):
+            dx = body_pos[i - 1, 0] - body_pos[i, 0]
+            dy = body_pos[i - 1, 1] - body_pos[i, 1]
+            norm = np.sqrt(dx * dx + dy * dy)
+            dx /= norm
+            dy /= norm
+            cos = min(max(dx * prev_x + dy * prev_y, -1.0), 1.0)
+            total += (dx * prev_y - dy * prev_x) * np.arccos(cos)
+            prev_x, prev_y = dx, dy
+            bx, by = body_pos[i, 0], body_pos[i, 1]
+            s = body_size[i]
+            if i == n - 1:
+                # Tail: reuses the perpendicular of the last inner part
+                points[k, 0] = px * s + bx
+                points[k, 1] = py * s + by
+                points[k + 1, 0] = -dx * s + bx
+                points[k + 1, 1] = -dy * s + by
+                points[k + 2, 0] = -px * s + bx
+                points[k + 2, 1] = -py * s + by
+                break
+            px, py = dy, -dx
+            mirror = m - 2 - (k - 4)
+            if special_smoothing:
+                front = (s + body_size[i - 1]) / 2
+                back = (s + body_size[i + 1]) / 2
+                ax, ay = dx * s / 3, dy * s / 3
+                points[k, 0] = px * front + bx + ax
+                points[k, 1] = py * front + by + ay
+                points[k + 1, 0] = px * s + bx
+                points[k + 1, 1] = py * s + by
+                points[k + 2, 0] = px * back + bx - ax
+                points[k + 2, 1] = py * back + by - ay
+                points[mirror, 0] = -px * front + bx + ax
+                points[mirror, 1] = -py * front + by + ay
+                points[mirror - 1, 0] = -px * s + bx
+                points[mirror - 1, 1] = -py * s + by
+                points[mirror - 2, 0] = -px * back + bx - ax
+                points[mirror - 2, 1] = -py * back + by - ay
+            else:
+                points[k, 0] = px * s + bx
+                points[k, 1] = py * s + by
+                points[mirror, 0] = -px * s + bx
+                points[mirror, 1] = -py * s + by
+            k += per_part
+        return np.degrees(total / (n - 1))
+
+    @numba.njit(cache=True)
+    def _forward_kinematics(joints, angles, lengths, first):
+        for j in range(max(first, 1), joints.shape[0]):
+            theta = angles[j - 1] * np.pi / 180
+            joints[j, 0] = joints[j - 1, 0] + lengths[j - 1] * np.cos(theta)
+            joints[j, 1] = joints[j - 1, 1] + lengths[j - 1] * np.sin(theta)
+
+    @numba.njit(cache=True)
+    def _point_towards(joints, angles, lengths, objective, delta_time, smooth_factor):
+        n = joints.shape[0]
+        theta = angles[n - 1] * np.pi / 180
+        head_x = joints[n - 1, 0] + lengths[n - 1] * np.cos(theta)
+        head_y = joints[n - 1, 1] + lengths[n - 1] * np.sin(theta)
+        if head_x == objective[0] and head_y == objective[1]:
+            return
+        for i in range(n):
+            j = n - 1 - i
+            v1x, v1y = head_x - joints[j, 0], head_y - joints[j, 1]
+            v2x, v2y = objective[0] - joints[j, 0], objective[1] - joints[j, 1]
+            mag = np.sqrt(v1x * v1x + v1y * v1y) * np.sqrt(v2x * v2x + v2y * v2y)
+            cos_theta = min(max((v1x * v2x + v1y * v2y) / mag, -1.0), 1.0)
+            angle_deg = np.degrees(np.arccos(cos_theta))
+            angles[j] += np.sign(v1x * v2y - v1y * v2x) * angle_deg * delta_time * smooth_factor / (n - i + 2)
+            _forward_kinematics(joints, angles, lengths, n - i)
+
+    class NumbaKernels:
+        name: str = 'numba'
+
+        @staticmethod
+        def solve_chain(body_pos: np.ndarray, links: np.ndarray):
+            n = body_pos.shape[-2]
+            pos = body_pos.reshape(-1, n, 2)  # A view as long as body_pos is contiguous
+            _solve_chain(pos, np.broadcast_to(links, pos.shape[:1] + (n - 1,)))
+            if not np.shares_memory(pos, body_pos):
+                body_pos[...] = pos.reshape(body_pos.shape)
+
+        @staticmethod
+        def body_outline(body_pos: np.ndarray, body_size: np.ndarray, direction: np.ndarray,
+                         special_smoothing: bool = False, out: np.ndarray = None) -> tuple[np.ndarray, float]:
+            if out is None:
+                out = np.empty((outline_size(len(body_pos), special_smoothing), 2))
+            angle_dif = _body_outline(body_pos, body_size, direction, special_smoothing, out)
+            return out, float(angle_dif)
+
+        @staticmethod
+        def forward_kinematics(joints: np.ndarray, angles: np.ndarray, lengths: np.ndarray, first: int = 1):
+            _forward_kinematics(joints, angles, lengths, first)
+
+        @staticmethod
+        def point_towards(joints: np.ndarray, angles: np.ndarray, lengths: np.ndarray, objective: np.ndarray,
+                          delta_time: float, smooth_factor: float):
+            _point_towards(joints, angles, lengths, objective, float(delta_time), float(smooth_factor))
+
+    BACKENDS['numba'] = NumbaKernels
+
+backend = NumpyKernels
+
+
+# =================== BACKEND SELECTION ===================
+def check_parity(kernels, reference=NumpyKernels, seed: int = 0, atol: float = 1e-9) -> dict[str, float]:
+    """
+    Runs random chains through both backends.
+    :return: the max absolute difference per kernel, every value must be <= atol
+    """
+    rng = np.random.default_rng(seed)
+    errors: dict[str, float] = {}
+
+    def record(name, a, b):
+        errors[name] = max(errors.get(name, 0.0), float(np.max(np.abs(np.subtract(a, b)))))
+
+    for n in (2, 3, 10, 64):
+        body_pos = np.cumsum(rng.normal(0, 20, (4, n, 2)), axis=1)
+        links = rng.uniform(5, 30, (4, n - 1))
+        a, b = body_pos.copy(), body_pos.copy()
+        reference.solve_chain(a, links)
+        kernels.solve_chain(b, links)
+        record('solve_chain', a, b)
+
+        body_size = rng.uniform(2, 30, n)
+        direction = rng.normal(0, 1, 2)
+        direction /= np.linalg.norm(direction)
+        for special in (False, True):
+            points_a, angle_a = reference.body_outline(a[0], body_size, direction, special)
+            points_b, angle_b = kernels.body_outline(a[0], body_size, direction, special)
+            record('body_outline', points_a, points_b)
+            record('body_outline', angle_a, angle_b)
+
+    for n in (1, 2, 5):
+        joints = np.zeros((n, 2))
+        joints[0] = rng.uniform(-100, 100, 2)
+        angles = rng.uniform(-180, 180, n)
+        lengths = rng.uniform(5, 30, n)
+        reference.forward_kinematics(joints, angles, lengths)
+        fk = joints.copy()
+        kernels.forward_kinematics(fk, angles, lengths)
+        record('forward_kinematics', joints, fk)
+
+        objective = rng.uniform(-100, 100, 2)
+        joints_b, angles_b = joints.copy(), angles.copy()
+        for _ in range(10):
+            reference.point_towards(joints, angles, lengths, objective, 16, 0.1)
+            kernels.point_towards(joints_b, angles_b, lengths, objective, 16, 0.1)
+        record('point_towards', joints, joints_b)
+        record('point_towards', angles, angles_b)
+    return errors
+
+
+def available() -> list[str]:
+    return list(BACKENDS)
+
+
+def select(name: str = 'auto', atol: float = 1e-9):
+    """
+    Chooses the backend used by the whole simulation, call it once at startup.
+    :param name: 'numpy', 'numba' or 'auto' (the compiled one when it is installed)
+    A compiled backend that does not match the reference within atol is rejected.
+    """
+    global backend
+    if name == 'auto':
+        name = 'numba' if 'numba' in BACKENDS else 'numpy'
+    if name not in BACKENDS:
+        warnings.warn(f"Kernel backend '{name}' is not available, using numpy. Available: {available()}")
+        name = 'numpy'
+
+    kernels = BACKENDS[name]
+    if kernels is not NumpyKernels:
+        errors = check_parity(kernels)
+        if max(errors.values()) > atol:
+            warnings.warn(f"Kernel backend '{name}' does not match the reference {errors}, using numpy")
+            kernels = NumpyKernels
+    backend = kernels
+    return backend
+
+
+if __name__ == '__main__':
+    for backend_name, backend_kernels in BACKENDS.items():
+        print(backend_name, check_parity(backend_kernels))
@@ -0,0 +1,79 @@
+"""
+Binary container used to save the simulation: a JSON header followed by raw arrays.
+
+    MAGIC | header size (uint64) | JSON header | array 0 | array 1 | ...
+
+Every array starts at a multiple of ALIGNMENT bytes, so `read` maps the file and hands
+out numpy views of it instead of parsing or copying anything: loading is as fast as the
+operating system can map the pages, whatever the size of the arrays.
+"""
+import json
+import mmap
+import os
+
+import numpy as np
+
+MAGIC = b'PROCSNAP'
+VERSION = 1
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write(path: str, header: dict, arrays: dict[str, np.ndarray]):
+    """
+    :param header: anything JSON can store, returned as it is by `read`
+    :param arrays: arrays saved under their name, they keep their dtype and shape
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    encoded = json.dumps({'version': VERSION, 'header': header, 'arrays': layout}).encode()
+    start = _align(len(MAGIC) + 8 + len(encoded))
+
+    # Written next to it and then swapped, a snapshot mapped by `read` keeps its old content.
+    # Windows refuses to replace a mapped file: the arrays `read` returned for it must be gone by now
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(encoded).to_bytes(8, 'little'))
+        file.write(encoded)
+        for name, array in arrays.items():
+            file.seek(start + layout[name]['offset'])
+            file.write(array.data)
+        file.truncate(start + offset)
+    os.replace(temporary, path)
+
+
+def read(path: str, writable: bool = True) -> tuple[dict, dict[str, np.ndarray]]:
+    """
+    :param writable: the arrays can be modified, changes stay in memory (copy on write) and never reach the file
+    :return: header and arrays given to `write`, the arrays are views of the mapped file
+    """
+    with open(path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"'{path}' is not a snapshot")
+    size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+    content = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+    if content['version'] != VERSION:
+        raise ValueError(f"'{path}' is a version {content['version']} snapshot, expected {VERSION}")
+
+    start = _align(len(MAGIC) + 8 + size)
+    arrays = {}
+    for name, spec in content['arrays'].items():
+        dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+        count = int(np.prod(shape))
+        if count == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.frombuffer(
+                buffer, dtype=dtype, count=count, offset=start + spec['offset']
+            ).reshape(shape)
+    return content['header'], arrays
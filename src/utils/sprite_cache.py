@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+def sizeof(sprite) -> int:
+    """ Bytes held by a cached sprite: the pixels of a pygame Surface or the data of a numpy array """
+    if hasattr(sprite, 'get_bytesize'):
+        return sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+    return getattr(sprite, 'nbytes', 0)
+
+
+class SpriteCache:
+    """
+    Least recently used cache of pre-rasterized surfaces.
+    Holds at most `max_bytes` bytes of sprites, the oldest ones are dropped when a new one does not fit.
+    Sprites vary a lot in size (a fin seen from close by is many times a far away one),
+    so they are counted by their memory rather than by their number.
+    """
+    def __init__(self, max_bytes: int = 128 * 2**20, sizeof: Callable[[object], int] = sizeof):
+        """
+        :param sizeof: bytes held by a sprite
+        """
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.entries: OrderedDict = OrderedDict()
+        self.sizes: dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self.entries
+
+    def get(self, key: Hashable, build: Callable):
+        """
+        :param key: anything hashable that identifies the sprite
+        :param build: called (without arguments) to create the sprite when it is not cached
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        self.misses += 1
+        sprite = build()
+        self.entries[key] = sprite
+        self.sizes[key] = size = self.sizeof(sprite)
+        self.bytes += size
+        # The new sprite stays even if it does not fit alone, it is about to be drawn
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            old_key, _ = self.entries.popitem(last=False)
+            self.bytes -= self.sizes.pop(old_key)
+        return sprite
+
+    def clear(self):
+        self.entries.clear()
+        self.sizes.clear()
+        self.bytes = 0
@@ -27,12 +27,14 @@ def get_point_from_pdl(point: np.array, d: float, l: float, rad: bool = True) ->
         d *= np.pi / 180
     return point + l * np.array([np.cos(d), np.sin(d)])
 
-def b_spline(waypoints, num_points: int = 100):
+def b_spline(waypoints, num_points: int = 100, max_smoothed: int = 256):
     """
     Creates a smooth path form waypoints
     original code: https://www.youtube.com/watch?v=ueUgHvUT2Z0
     :param waypoints: Points to be smoothen into a smooth shape
     :param num_points: how many points should be in that smooth shape
+    :param max_smoothed: longer paths (very long bodies) go through an interpolating spline instead,
+                         the smoothing fit grows quadratically with the points and differs by about a pixel
     :return:
     """
     if isinstance(waypoints, np.ndarray):
@@ -44,6 +46,15 @@ def b_spline(waypoints, num_points: int = 100):
             x.append(point[0])
             y.append(point[1])
 
+    if len(x) > max_smoothed:
+        points = np.column_stack([x, y])
+        # Parametrized by the distance along the path, like splprep
+        u = np.zeros(len(points))
+        np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1), out=u[1:])
+        u /= u[-1]
+        smooth_shape = interpolate.make_interp_spline(u, points, k=3)(np.linspace(0, 1, num=num_points))
+        return smooth_shape[:, 0], smooth_shape[:, 1]
+
     tck, *rest = interpolate.splprep([x,y])
     u = np.linspace(0, 1, num=num_points)
     smooth_shape = interpolate.splev(u, tck)
@@ -69,4 +80,17 @@ def compare_dist_opt(v: np.ndarray, u: np.ndarray, dist: float) -> bool:
     :param dist: max dist
     :return: True if u and v are closer than dist, else o.w.
     """
-    return (v[0] - u[0])**2 + (v[1] - u[1])**2 <= dist**2
\ No newline at end of file
+    return (v[0] - u[0])**2 + (v[1] - u[1])**2 <= dist**2
+
+def rotate_points(points: np.ndarray, angle: float) -> np.ndarray:
+    """
+    :param points: (n, 2) points
+    :param angle: degrees, same orientation as the world
+    :return: new array with the points rotated around the origin
+    """
+    radians = np.radians(angle)
+    cos, sin = np.cos(radians), np.sin(radians)
+    rotated = np.empty_like(points)
+    rotated[:, 0] = points[:, 0] * cos - points[:, 1] * sin
+    rotated[:, 1] = points[:, 0] * sin + points[:, 1] * cos
+    return rotated
@@ -0,0 +1,32 @@
+import numpy as np
+
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.display_list import DisplayList
+
+VIEW = (0, 0, 640, 480)
+
+
+def trajectory(seed: int, n_frames: int = 60) -> np.ndarray:
+    settings = Settings(WIDTH=640, HEIGHT=480, N_ANIMALS=30, SEED=seed, TEMPORAL_LOD=True, DRAW_LEGS=True)
+    settings.SCREEN_CENTER = (320, 240)
+    swarm = Swarm(DisplayList(), settings, seed)
+    swarm.reset()
+    frames = []
+    for t in range(n_frames):
+        swarm.step((320 + 200 * np.cos(t / 30), 240 + 100 * np.sin(t / 50)), 16, VIEW)
+        swarm.render(VIEW)
+        frames.append(np.concatenate(
+            [creature.body_pos.ravel() for creature in swarm]
+            + [tentacle.joints.ravel() for creature in swarm for tentacle in creature.tentacles()]
+        ))
+    return np.array(frames)
+
+
+def test_same_seed_same_trajectory():
+    assert np.array_equal(trajectory(7), trajectory(7))
+
+
+def test_other_seed_other_trajectory():
+    first, second = trajectory(7), trajectory(8)
+    assert first.shape != second.shape or not np.array_equal(first, second)
@@ -0,0 +1,26 @@
+import pytest
+
+from benchmarks.frame_allocations import BUDGET, CREATURE_BUDGET, MAX_GROWTH, measure
+from src.utils import kernels
+
+BACKENDS = [
+    pytest.param(name, marks=pytest.mark.skipif(name not in kernels.BACKENDS, reason=f"{name} is not installed"))
+    for name in ('numpy', 'numba')
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = kernels.backend
+    yield kernels.select(request.param)
+    kernels.backend = previous
+
+
+def test_steady_frame_stays_in_budget(backend):
+    # Enough creatures to fill the sprite and shape caches during the warmup, they would count as growth
+    result = measure(n_creatures=50, n_frames=20, seed=0)
+
+    assert result['peak_per_frame'] <= BUDGET
+    assert result['peak_per_creature'] <= CREATURE_BUDGET
+    assert result['growth_per_frame'] <= MAX_GROWTH
+    assert result['gc_per_frame'] == 0
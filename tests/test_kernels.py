@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from src.utils import kernels
+from src.utils.kernels import NumpyKernels
+
+BACKENDS = [
+    pytest.param(name, marks=pytest.mark.skipif(name not in kernels.BACKENDS, reason=f"{name} is not installed"))
+    for name in ('numpy', 'numba')
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return kernels.BACKENDS[request.param]
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.mark.parametrize('n', [2, 3, 10, 64])
+def test_solve_chain_keeps_links(backend, rng, n):
+    body_pos = np.cumsum(rng.normal(0, 20, (4, n, 2)), axis=1)
+    links = rng.uniform(5, 30, (4, n - 1))
+    head = body_pos[:, 0].copy()
+    backend.solve_chain(body_pos, links)
+
+    np.testing.assert_allclose(np.linalg.norm(np.diff(body_pos, axis=1), axis=-1), links, rtol=1e-12)
+    np.testing.assert_array_equal(body_pos[:, 0], head)
+
+
+@pytest.mark.parametrize('n', [2, 10, 1000])
+def test_solve_chain_single_body_matches_batch(backend, rng, n):
+    body_pos = np.cumsum(rng.normal(0, 20, (n, 2)), axis=0)
+    links = rng.uniform(5, 30, n - 1)
+    single, batch = body_pos.copy(), body_pos[None].copy()
+    backend.solve_chain(single, links)
+    NumpyKernels.solve_chain(batch, links[None])
+
+    np.testing.assert_allclose(single, batch[0], rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize('special_smoothing', [False, True])
+@pytest.mark.parametrize('n', [1, 2, 3, 10])
+def test_body_outline_matches_reference(backend, rng, n, special_smoothing):
+    body_pos = np.cumsum(rng.normal(0, 20, (n, 2)), axis=0)
+    body_size = rng.uniform(2, 30, n)
+    direction = rng.normal(0, 1, 2)
+    direction /= np.linalg.norm(direction)
+    out = np.empty((kernels.outline_size(n, special_smoothing), 2))
+
+    points, angle_dif = backend.body_outline(body_pos, body_size, direction, special_smoothing, out)
+    expected, expected_angle = NumpyKernels.body_outline(body_pos, body_size, direction, special_smoothing)
+
+    assert points is out
+    np.testing.assert_allclose(points, expected, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(angle_dif, expected_angle, rtol=0, atol=1e-9)
+
+
+def test_body_outline_straight_body(backend):
+    n = 5
+    body_pos = np.column_stack([np.zeros(n), -10.0 * np.arange(n)])
+    body_size = np.full(n, 4.0)
+    points, angle_dif = backend.body_outline(body_pos, body_size, np.array([0.0, 1.0]), False,
+                                             np.empty((kernels.outline_size(n), 2)))
+
+    assert angle_dif == pytest.approx(0)
+    tail = 4 + (n - 2) + 1
+    sides = np.delete(points, [0, 1, 2, tail], axis=0)
+    # Both sides of a straight body are its size away from the spine, the tail tip is on it
+    np.testing.assert_allclose(np.abs(sides[:, 0]), 4.0)
+    np.testing.assert_allclose(points[tail], [0.0, -10.0 * (n - 1) - 4.0], atol=1e-12)
+
+
+@pytest.mark.parametrize('n', [1, 2, 5])
+def test_forward_kinematics_places_joints(backend, rng, n):
+    joints = np.zeros((n, 2))
+    joints[0] = rng.uniform(-100, 100, 2)
+    angles = rng.uniform(-180, 180, n)
+    lengths = rng.uniform(5, 30, n)
+    backend.forward_kinematics(joints, angles, lengths)
+
+    theta = np.radians(angles[:-1])
+    expected = joints[:-1] + lengths[:-1, None] * np.column_stack([np.cos(theta), np.sin(theta)])
+    np.testing.assert_allclose(joints[1:], expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('n', [1, 2, 5])
+def test_point_towards_matches_reference(backend, rng, n):
+    joints = np.zeros((n, 2))
+    joints[0] = rng.uniform(-100, 100, 2)
+    angles = rng.uniform(-180, 180, n)
+    lengths = rng.uniform(5, 30, n)
+    NumpyKernels.forward_kinematics(joints, angles, lengths)
+    objective = rng.uniform(-100, 100, 2)
+    expected_joints, expected_angles = joints.copy(), angles.copy()
+
+    for _ in range(10):
+        backend.point_towards(joints, angles, lengths, objective, 16, 0.1)
+        NumpyKernels.point_towards(expected_joints, expected_angles, lengths, objective, 16, 0.1)
+
+    np.testing.assert_allclose(joints, expected_joints, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(angles, expected_angles, rtol=0, atol=1e-9)
+
+
+def test_point_towards_gets_closer(backend):
+    joints = np.zeros((2, 2))
+    angles = np.array([0.0, 0.0])
+    lengths = np.array([10.0, 10.0])
+    NumpyKernels.forward_kinematics(joints, angles, lengths)
+    objective = np.array([0.0, 15.0])
+
+    def tip_distance():
+        theta = np.radians(angles[-1])
+        tip = joints[-1] + lengths[-1] * np.array([np.cos(theta), np.sin(theta)])
+        return np.linalg.norm(tip - objective)
+
+    before = tip_distance()
+    for _ in range(20):
+        backend.point_towards(joints, angles, lengths, objective, 16, 0.1)
+    assert tip_distance() < before
+
+
+def test_check_parity(backend):
+    errors = kernels.check_parity(backend)
+    np.testing.assert_allclose(list(errors.values()), 0, atol=1e-9)
@@ -0,0 +1,161 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import subprocess
+import sys
+import numpy as np
+import pygame as py
+import pytest
+
+from src.settings.settings import Settings, Colors
+from src.classes.camera import Camera
+from src.classes.canvas import Canvas
+from src.classes.display_list import DisplayList
+from src.classes.procedural_animals import ProceduralCreature
+from src.classes.raster import PolygonBatch, RasterBackend
+from src.classes.swarm import Swarm
+
+BASE = (200, 40, 40)
+CONTRAST = (40, 200, 40)
+
+
+def square(x0: float, y0: float, size: float) -> np.ndarray:
+    return np.array([(x0, y0), (x0 + size, y0), (x0 + size, y0 + size), (x0, y0 + size)], dtype=float)
+
+
+def flush(batch: PolygonBatch, size: tuple[int, int] = (40, 30)) -> np.ndarray:
+    width, height = size
+    pixels = np.zeros((height, width), dtype=np.int64)
+    batch.flush(pixels, np.arange(1, len(batch) + 1))
+    return pixels
+
+
+def test_later_polygon_wins():
+    batch = PolygonBatch()
+    batch.polygon(None, square(0, 0, 20))
+    batch.polygon(None, square(10, 10, 20))
+    batch.polygon(None, square(5, 5, 10))
+    pixels = flush(batch)
+
+    assert pixels[2, 2] == 1
+    assert pixels[25, 25] == 2
+    assert pixels[8, 8] == 3  # On top of both
+    assert pixels[12, 12] == 3
+    assert pixels[17, 17] == 2  # Over the first one
+
+
+def test_many_overlapping_polygons_keep_drawing_order():
+    batch = PolygonBatch()
+    for _ in range(200):
+        batch.polygon(None, square(0, 0, 30))
+    batch.polygon(None, square(10, 10, 5), 2)  # Outline, its quads overlap each other at the corners
+    pixels = flush(batch)
+
+    assert set(np.unique(pixels[:30, :30])) == {200, 201}
+    assert pixels[10, 12] == 201
+    assert pixels[12, 12] == 200
+
+
+def creature_image(batch: bool, fin_sprites: bool) -> tuple[np.ndarray, ProceduralCreature, Canvas]:
+    settings = Settings(WIDTH=480, HEIGHT=480, DRAW_LEGS=True, FIN_SPRITES=fin_sprites)
+    surface = py.Surface((480, 480))
+    canvas = Canvas(surface, camera=Camera((0, 0), 1.5), batch=batch)
+    creature = ProceduralCreature(canvas, (0, 0), np.log(12 - np.arange(12) + 1) * 10, BASE, CONTRAST, settings)
+    for _ in range(60):
+        creature.move_towards((300, 40), 16)
+    canvas.camera.center = (creature.body_pos[0] + creature.body_pos[-1]) / 2
+    canvas.fill(settings.BACKGROUND_COLOR)
+    creature.render()
+    canvas.present()
+    return py.surfarray.array3d(surface).swapaxes(0, 1), creature, canvas
+
+
+@pytest.mark.parametrize('fin_sprites', [False, True])
+@pytest.mark.parametrize('batch', [False, True])
+def test_creature_layers(batch, fin_sprites):
+    image, creature, canvas = creature_image(batch, fin_sprites)
+
+    def color(world_point) -> tuple:
+        x, y = np.floor(canvas.to_screen(world_point)).astype(int)
+        return tuple(image[y, x])
+
+    # Legs and lateral fins are anchored inside the body, which is drawn over them
+    for index in creature.members_indices:
+        for anchor in creature.leg_points[index][:2]:
+            assert color(anchor) == BASE
+    # Eyes over the body, pupils over the eyes
+    eyes = creature.eyes
+    for center, pupil in ((eyes.pos1, eyes.pupil_1), (eyes.pos2, eyes.pupil_2)):
+        assert color(pupil) == Colors.BLACK
+        assert color(center - (pupil - center) * 0.8) == Colors.WHITE
+    # The back fin is drawn last, over the spine
+    assert color(creature.body_pos[creature.members_index_2]) in (CONTRAST, Colors.WHITE)
+
+
+# =================== HEADLESS ===================
+def swarm_frames(screen, n_frames: int = 20) -> Swarm:
+    settings = Settings(WIDTH=640, HEIGHT=480, N_ANIMALS=20, SEED=1, DRAW_LEGS=True, WORLD_RADIUS=150)
+    settings.SCREEN_CENTER = (320, 240)
+    swarm = Swarm(screen, settings, settings.SEED)
+    swarm.reset()
+    for t in range(n_frames):
+        screen.clear()
+        swarm.step((320 + 100 * np.cos(t / 9), 240 + 100 * np.sin(t / 9)), 16)
+        swarm.render()
+    return swarm
+
+
+def test_headless_frame():
+    display_list = DisplayList()
+    swarm = swarm_frames(display_list)
+    raster = RasterBackend((640, 480), Camera((320, 240), 0.75))
+    raster.fill(swarm.settings.BACKGROUND_COLOR)
+    display_list.draw(raster)
+
+    def color(world_point) -> tuple:
+        x, y = np.floor(raster.to_screen(world_point)).astype(int)
+        return tuple(raster.image[y, x])
+
+    # Creatures are drawn in order: nothing covers the eyes of the last one, they cover its body
+    eyes = swarm.creatures[-1].eyes
+    for center, pupil in ((eyes.pos1, eyes.pupil_1), (eyes.pos2, eyes.pupil_2)):
+        assert color(pupil) == Colors.BLACK
+        assert color(center - (pupil - center) * 0.8) == Colors.WHITE
+    for creature in swarm:
+        assert color(creature.body_pos[-2]) != swarm.settings.BACKGROUND_COLOR
+
+    # Same rasterizer as the batched canvas, given the same display list
+    canvas = Canvas(py.Surface((640, 480)), camera=Camera((320, 240), 0.75), batch=True)
+    canvas.surface.fill(swarm_frames(canvas).settings.BACKGROUND_COLOR)
+    canvas.present()
+    np.testing.assert_array_equal(py.surfarray.array3d(canvas.surface).swapaxes(0, 1), raster.image)
+
+
+def test_simulation_runs_without_pygame():
+    script = """
+import sys
+sys.modules['pygame'] = None  # Any import of pygame fails
+import numpy as np
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.display_list import DisplayList
+from src.classes.raster import RasterBackend
+
+settings = Settings(WIDTH=320, HEIGHT=240, N_ANIMALS=5, SEED=0, DRAW_LEGS=True, WORLD_RADIUS=50)
+settings.SCREEN_CENTER = (160, 120)
+screen = DisplayList()
+swarm = Swarm(screen, settings, 0)
+swarm.reset()
+raster = RasterBackend((320, 240))
+for t in range(3):
+    screen.clear()
+    swarm.step((160, 120), 16)
+    swarm.render()
+    raster.fill(settings.BACKGROUND_COLOR)
+    screen.draw(raster)
+assert (raster.image != settings.BACKGROUND_COLOR).any()
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': root})
+    assert result.returncode == 0, result.stderr
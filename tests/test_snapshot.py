@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from src.settings.settings import Settings
+from src.classes.swarm import Swarm
+from src.classes.display_list import DisplayList
+
+VIEW = (0, 0, 640, 480)
+
+
+def make_settings(**kwargs) -> Settings:
+    settings = Settings(WIDTH=640, HEIGHT=480, N_ANIMALS=30, SEED=2, TEMPORAL_LOD=True, **kwargs)
+    settings.SCREEN_CENTER = (320, 240)
+    return settings
+
+
+def run(swarm: Swarm, start: int, n_frames: int):
+    for t in range(start, start + n_frames):
+        # Stops now and then so creatures and legs fall asleep
+        swarm.settings.MOVING_SPEED = 0.0 if t % 90 > 60 else 0.5
+        swarm.step((320 + 200 * np.cos(t / 30), 240 + 100 * np.sin(t / 50)), 16, VIEW)
+        swarm.render(VIEW)
+
+
+def state(swarm: Swarm) -> list[np.ndarray]:
+    arrays = [swarm.heads(), swarm.reaches(), swarm.scheduler.pending]
+    for creature in swarm:
+        arrays += [creature.body_pos, creature.body_direction, creature.get_sleep_state()]
+        arrays += creature.get_leg_state()
+    return arrays
+
+
+@pytest.mark.parametrize('saved_at', [40, 80])  # Moving, idle
+def test_loaded_world_continues_exactly(tmp_path, saved_at):
+    path = tmp_path / 'world.snapshot'
+    swarm = Swarm(DisplayList(), make_settings(DRAW_LEGS=True), 2)
+    swarm.reset()
+    run(swarm, 0, saved_at)
+    swarm.save(path)
+    run(swarm, saved_at, 60)
+
+    loaded, _ = Swarm.load(path, DisplayList(), make_settings())
+    run(loaded, saved_at, 60)
+
+    assert loaded.rng.bit_generator.state == swarm.rng.bit_generator.state
+    for expected, value in zip(state(swarm), state(loaded), strict=True):
+        np.testing.assert_array_equal(value, expected)
+
+
+def test_legs_are_built_when_needed(tmp_path):
+    path = tmp_path / 'world.snapshot'
+    swarm = Swarm(DisplayList(), make_settings(DRAW_LEGS=True), 2)
+    swarm.reset()
+    run(swarm, 0, 50)
+    swarm.save(path)
+
+    settings = make_settings()
+    loaded, _ = Swarm.load(path, DisplayList(), settings)
+    settings.DRAW_LEGS = False
+    run(loaded, 50, 10)
+    assert all(creature.leg_state is not None for creature in loaded)
+
+    # Saved again without ever being built
+    loaded.save(path)
+    again, _ = Swarm.load(path, DisplayList(), make_settings())
+    for expected, value in zip(state(loaded), state(again), strict=True):
+        np.testing.assert_array_equal(value, expected)
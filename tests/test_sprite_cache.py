@@ -0,0 +1,44 @@
+import numpy as np
+import pygame as py
+
+from src.utils.sprite_cache import SpriteCache
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = SpriteCache(max_bytes=3000)
+    for key in 'abc':
+        cache.get(key, lambda: np.zeros(1000, dtype=np.uint8))
+    cache.get('a', lambda: None)  # Hit, 'b' is now the oldest
+    cache.get('d', lambda: np.zeros(1000, dtype=np.uint8))
+
+    assert list(cache.entries) == ['c', 'a', 'd']
+    assert cache.bytes == 3000
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_large_sprite_replaces_several_small_ones():
+    cache = SpriteCache(max_bytes=4000)
+    for key in range(4):
+        cache.get(key, lambda: np.zeros(1000, dtype=np.uint8))
+    cache.get('big', lambda: np.zeros(2500, dtype=np.uint8))
+
+    assert list(cache.entries) == [3, 'big']
+    assert cache.bytes == 3500
+
+
+def test_sprite_larger_than_the_budget_is_kept_alone():
+    cache = SpriteCache(max_bytes=100)
+    cache.get('small', lambda: np.zeros(10, dtype=np.uint8))
+    sprite = cache.get('huge', lambda: np.zeros(1000, dtype=np.uint8))
+
+    assert len(sprite) == 1000
+    assert list(cache.entries) == ['huge']
+
+
+def test_surfaces_count_their_pixels():
+    cache = SpriteCache()
+    cache.get('sprite', lambda: py.Surface((20, 10), py.SRCALPHA))
+
+    assert cache.bytes == 20 * 10 * 4
+    cache.clear()
+    assert cache.bytes == 0 and len(cache) == 0
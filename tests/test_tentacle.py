@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.classes.knematic_limb import Tentacle
+
+
+def make_tentacle(objective):
+    # Two limbs of 20 px
+    return Tentacle(None, (0, 0), 2, 40, 4, 0.1, (0, 0, 0), objective=objective)
+
+
+def settle(tentacle, delta_time, epsilon, max_steps=100000):
+    for _ in range(max_steps):
+        tentacle.point_towards(delta_time, epsilon=epsilon)
+        if tentacle.asleep:
+            break
+    return tentacle
+
+
+def tip(tentacle):
+    theta = np.radians(tentacle.angles[-1])
+    return tentacle.joints[-1] + tentacle.lengths[-1] * np.array([np.cos(theta), np.sin(theta)])
+
+
+@pytest.mark.parametrize('delta_time', [1, 4, 16])
+def test_leg_reaches_objective_at_any_frame_rate(delta_time):
+    objective = (24.0, 32.0)
+    tentacle = settle(make_tentacle(objective), delta_time, 0.5)
+
+    assert tentacle.asleep
+    assert np.linalg.norm(tip(tentacle) - objective) <= 0.5
+
+
+@pytest.mark.parametrize('delta_time', [1, 16])
+def test_leg_out_of_reach_stretches_towards_objective(delta_time):
+    objective = np.array([0.0, 60.0])
+    tentacle = settle(make_tentacle(objective), delta_time, 0.5)
+    reference = settle(make_tentacle(objective), delta_time, 0.0, max_steps=2000)
+
+    assert tentacle.asleep
+    assert np.linalg.norm(tip(tentacle) - objective) <= 20 + 0.5
+    np.testing.assert_allclose(tip(tentacle), tip(reference), atol=0.5)
+
+
+def test_sleeping_leg_wakes_on_new_objective():
+    tentacle = settle(make_tentacle((24.0, 32.0)), 16, 0.5)
+    tentacle.point_towards(16, (-24.0, 32.0), 0.5)
+
+    assert not tentacle.asleep
+    settle(tentacle, 16, 0.5)
+    assert np.linalg.norm(tip(tentacle) - (-24.0, 32.0)) <= 0.5